@@ -0,0 +1,54 @@
+"""
+Compares the bulk triangle mesh to BRep conversion used by Tpms with the
+former face by face construction, for increasing values of nSample
+
+usage: python brep_conversion.py [nSample ...]
+"""
+import sys
+import time
+
+import cadquery as cq
+import numpy as np
+import pyvista as pv
+
+from microgen import Tpms, tpms, trianglesToShell
+
+
+def legacyShell(points: np.ndarray, triangles: np.ndarray) -> cq.Shell:
+    """
+    Former conversion: one wire and one face per triangle, then sewing
+    """
+    faces = []
+    for ixs in np.c_[triangles, triangles[:, 0]]:
+        lines = [
+            cq.Edge.makeLine(cq.Vector(*points[v1]), cq.Vector(*points[v2]))
+            for v1, v2 in zip(ixs, ixs[1:])
+        ]
+        wire = cq.Wire.assembleEdges(lines)
+        faces.append(cq.Face.makeFromWires(wire))
+    return cq.Shell.makeShell(faces)
+
+
+def main(nSamples: list[int]) -> None:
+    geometry = Tpms(surface_function=tpms.gyroid)
+    print(f"{'nSample':>8} {'faces':>8} {'legacy (s)':>11} {'bulk (s)':>9} {'speedup':>8}")
+    for nSample in nSamples:
+        mesh = geometry.generateSurfaceVtk(nSample=nSample)  # type: pv.PolyData
+        triangles = mesh.faces.reshape(-1, 4)[:, 1:]
+
+        start = time.perf_counter()
+        legacyShell(mesh.points, triangles)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        shell = trianglesToShell(mesh.points, triangles)
+        bulk = time.perf_counter() - start
+
+        print(
+            f"{nSample:>8} {len(shell.Faces()):>8} {legacy:>11.3f} {bulk:>9.3f}"
+            f" {legacy / bulk:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10, 20, 30, 40])
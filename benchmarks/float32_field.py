@@ -0,0 +1,44 @@
+"""
+Compares the sampling and contouring of TPMS fields in float64 and float32:
+throughput and distance from the float32 isosurface points to the float64
+isosurface (mean and 99th percentile, isolated points where the function
+is zero at a grid point up to round-off make the maximum meaningless)
+
+usage: python float32_field.py [nSample ...]
+"""
+import sys
+import time
+
+import numpy as np
+
+from microgen import tpms
+
+
+def sampleAndContour(nSample: int, dtype: np.dtype):
+    tpms.field_cache.clear()
+    start = time.perf_counter()
+    grid = tpms.sampleField(tpms.gyroid, nSample, dtype=dtype)
+    mesh = grid.contour([0.0], scalars=tpms.FIELD_NAME, method="flying_edges")
+    return mesh, time.perf_counter() - start
+
+
+def main(nSamples: list[int]) -> None:
+    print(
+        f"{'nSample':>8} {'float64 (s)':>12} {'float32 (s)':>12}"
+        f" {'speedup':>8} {'mean error':>11} {'p99 error':>10} {'spacing':>8}"
+    )
+    for nSample in nSamples:
+        mesh64, time64 = sampleAndContour(nSample, np.float64)
+        mesh32, time32 = sampleAndContour(nSample, np.float32)
+        _, closest = mesh64.find_closest_cell(mesh32.points, return_closest_point=True)
+        distance = np.linalg.norm(mesh32.points - closest, axis=1)
+        print(
+            f"{nSample:>8} {time64:>12.3f} {time32:>12.3f} {time64 / time32:>7.2f}x"
+            f" {distance.mean():>11.2e} {np.percentile(distance, 99):>10.2e}"
+            f" {1.0 / (nSample - 1):>8.2e}"
+        )
+    tpms.field_cache.clear()
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [50, 100, 200, 300])
@@ -0,0 +1,37 @@
+"""
+Compares Tpms.generateVtk through the BRep (generate) with the implicit
+pipeline building the thick part directly from the sampled field
+
+usage: python implicit_vtk.py [nSample ...]
+"""
+import sys
+import time
+
+from microgen import Tpms, tpms
+
+
+def main(nSamples: list[int]) -> None:
+    print(f"{'part':>8} {'nSample':>8} {'brep (s)':>9} {'implicit (s)':>13} {'speedup':>8}")
+    for type_part in ["sheet", "skeletal"]:
+        geometry = Tpms(
+            surface_function=tpms.gyroid, type_part=type_part, thickness=0.05
+        )
+        for nSample in nSamples:
+            tpms.field_cache.clear()
+            start = time.perf_counter()
+            geometry.generateVtk(nSample=nSample)
+            brep = time.perf_counter() - start
+
+            tpms.field_cache.clear()
+            start = time.perf_counter()
+            geometry.generateVtk(nSample=nSample, implicit=True)
+            implicit = time.perf_counter() - start
+
+            print(
+                f"{type_part:>8} {nSample:>8} {brep:>9.3f} {implicit:>13.3f}"
+                f" {brep / implicit:>7.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10, 20])
@@ -0,0 +1,41 @@
+"""
+Compares the pinned smoothing methods of smoothSurface with the unpinned
+pyvista smooth on gyroid contours, 100 iterations
+
+usage: python smoothing.py [nSample ...]
+"""
+import sys
+import time
+
+from microgen import tpms
+
+
+def main(nSamples: list[int]) -> None:
+    print(
+        f"{'nSample':>8} {'points':>8} {'smooth (s)':>11} {'vtk (s)':>8}"
+        f" {'laplacian (s)':>14} {'taubin (s)':>11}"
+    )
+    for nSample in nSamples:
+        grid = tpms.sampleField(tpms.gyroid, nSample)
+        mesh = grid.contour([0.0], scalars=tpms.FIELD_NAME, method="flying_edges")
+        bounds = [[-0.5, 0.5]] * 3
+
+        start = time.perf_counter()
+        mesh.smooth(n_iter=100)
+        reference = time.perf_counter() - start
+
+        times = []
+        for method in ["vtk", "laplacian", "taubin"]:
+            start = time.perf_counter()
+            tpms.smoothSurface(mesh, 100, method, bounds=bounds)
+            times.append(time.perf_counter() - start)
+
+        print(
+            f"{nSample:>8} {mesh.n_points:>8} {reference:>11.3f} {times[0]:>8.3f}"
+            f" {times[1]:>14.3f} {times[2]:>11.3f}"
+        )
+    tpms.field_cache.clear()
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [30, 60, 100])
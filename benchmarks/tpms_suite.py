@@ -0,0 +1,254 @@
+"""
+Times the TPMS pipelines (createSurface, createSurfaces, generate,
+generateVtk and generateSurfaceVtk, and the fast paths generateVtk with
+implicit=True and generate with band_mesh=True) for every built-in
+function, several values of nSample and both sheet and skeletal parts
+
+Each case runs in its own Python process and records the wall time, the
+peak resident memory of the process (ru_maxrss, OCC and VTK allocations
+included), the number of triangles of the meshes or of faces of the BReps,
+and the volume of the thick parts. A case whose process fails is recorded
+with the last line of its error instead, and the sweep goes on.
+
+The default sweep runs in about an hour: every function, both parts,
+every mode and nSample 10 and 20. --full runs the whole range of nSample
+(10, 20, 50, 100 and 200), which takes many hours and a lot of memory for
+the BRep modes at 200. Other sweeps are selected with --nSample,
+--functions and --modes.
+
+The results are compared to the baseline JSON file (tpms_baseline.json
+next to this script by default, written by --save on the reference
+machine): a case is reported as a regression if it is slower or uses more
+memory than the baseline by more than --tolerance, if its counts or
+volume changed, or if it fails while the baseline case did not, and the
+script then exits with status 1. Cases missing from the baseline are not
+compared.
+
+usage: python tpms_suite.py [--nSample N ... | --full] [--functions NAME ...]
+                            [--modes MODE ...] [--save]
+                            [--baseline FILE] [--tolerance 0.2]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from microgen import Tpms, tpms
+
+FUNCTIONS = [
+    "gyroid",
+    "schwarzP",
+    "schwarzD",
+    "neovius",
+    "schoenIWP",
+    "schoenFRD",
+    "fischerKochS",
+    "pmy",
+    "honeycomb",
+]
+
+MODES = [
+    "createSurface",
+    "createSurfaces",
+    "generate",
+    "generateVtk",
+    "generateSurfaceVtk",
+    "generateVtkImplicit",
+    "generateBandMesh",
+]
+
+# modes depending on type_part, the surfaces are only run once per function
+PART_MODES = {"generate", "generateVtk", "generateVtkImplicit", "generateBandMesh"}
+
+DEFAULT_NSAMPLE = [10, 20]
+FULL_NSAMPLE = [10, 20, 50, 100, 200]
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "tpms_baseline.json")
+
+
+def runCase(geometry: Tpms, mode: str, nSample: int) -> dict:
+    """
+    Runs one mode of geometry in this process and measures it
+    """
+    start = time.perf_counter()
+    if mode == "createSurface":
+        shells = [geometry.createSurface(isovalue=0.0, nSample=nSample)]
+    elif mode == "createSurfaces":
+        shells = geometry.createSurfaces(
+            isovalues=[-geometry.thickness, geometry.thickness], nSample=nSample
+        )
+    elif mode == "generate":
+        shape = geometry.generate(nSample=nSample)
+    elif mode == "generateVtk":
+        mesh = geometry.generateVtk(nSample=nSample)
+    elif mode == "generateVtkImplicit":
+        mesh = geometry.generateVtk(nSample=nSample, implicit=True)
+    elif mode == "generateBandMesh":
+        shape = geometry.generate(nSample=nSample, band_mesh=True)
+    else:
+        mesh = geometry.generateSurfaceVtk(isovalue=0.0, nSample=nSample)
+    wall_time = time.perf_counter() - start
+    # in kilobytes on Linux
+    peak = 1024 * resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    result = {"time": wall_time, "peak_memory": peak}
+    if mode in ("createSurface", "createSurfaces"):
+        result["faces"] = sum(len(shell.Faces()) for shell in shells)
+    elif mode in ("generate", "generateBandMesh"):
+        result["faces"] = len(shape.Faces())
+        result["volume"] = shape.Volume()
+    elif mode in ("generateVtk", "generateVtkImplicit"):
+        result["triangles"] = mesh.n_faces
+        result["volume"] = mesh.volume
+    else:
+        result["triangles"] = mesh.n_faces
+    return result
+
+
+def caseName(function: str, type_part: str, mode: str, nSample: int) -> str:
+    return f"{function}/{type_part}/{mode}/{nSample}"
+
+
+def runCaseProcess(name: str) -> dict:
+    """
+    Runs a case in a new Python process, so that its peak memory is its own
+    """
+    process = subprocess.run(
+        [sys.executable, __file__, "--case", name],
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        lines = process.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit {process.returncode}"}
+    return json.loads(process.stdout.splitlines()[-1])
+
+
+def runSingleCase(name: str) -> None:
+    function, type_part, mode, nSample = name.split("/")
+    geometry = Tpms(
+        surface_function=getattr(tpms, function), type_part=type_part, thickness=0.05
+    )
+    print(json.dumps(runCase(geometry, mode, int(nSample))))
+
+
+def runSuite(
+    functions: list[str], modes: list[str], nSamples: list[int]
+) -> dict[str, dict]:
+    results = {}
+    for function in functions:
+        for type_part in ["sheet", "skeletal"]:
+            for mode in modes:
+                if type_part == "skeletal" and mode not in PART_MODES:
+                    continue
+                for nSample in nSamples:
+                    name = caseName(function, type_part, mode, nSample)
+                    results[name] = runCaseProcess(name)
+                    printResult(name, results[name])
+    return results
+
+
+def printResult(name: str, result: dict) -> None:
+    if "error" in result:
+        print(f"{name:<40} failed: {result['error']}")
+        return
+    count = result.get("faces", result.get("triangles"))
+    volume = result.get("volume")
+    print(
+        f"{name:<40} {result['time']:>9.3f} {result['peak_memory'] / 2**20:>10.1f}"
+        f" {count:>10} {'' if volume is None else f'{volume:.6f}':>10}"
+    )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Returns the description of the regressions of results against baseline
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None or "error" in reference:
+            continue
+        if "error" in result:
+            regressions.append(f"{name}: failed: {result['error']}")
+            continue
+        for key in ("time", "peak_memory"):
+            if result[key] > (1.0 + tolerance) * reference[key]:
+                regressions.append(
+                    f"{name}: {key} {result[key]:.4g} > {reference[key]:.4g}"
+                )
+        for key in ("faces", "triangles"):
+            if key in reference and result[key] != reference[key]:
+                regressions.append(
+                    f"{name}: {key} {result[key]} != {reference[key]}"
+                )
+        if "volume" in reference and not np.isclose(
+            result["volume"], reference["volume"], rtol=1.0e-3
+        ):
+            regressions.append(
+                f"{name}: volume {result['volume']:.6f} != {reference['volume']:.6f}"
+            )
+    return regressions
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    samples = parser.add_mutually_exclusive_group()
+    samples.add_argument("--nSample", type=int, nargs="+", default=DEFAULT_NSAMPLE)
+    samples.add_argument(
+        "--full",
+        action="store_const",
+        const=FULL_NSAMPLE,
+        dest="nSample",
+        help=f"runs nSample {' '.join(map(str, FULL_NSAMPLE))}",
+    )
+    parser.add_argument(
+        "--functions", nargs="+", default=FUNCTIONS, choices=FUNCTIONS
+    )
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument(
+        "--save", action="store_true", help="adds the results to the baseline"
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case is not None:
+        runSingleCase(args.case)
+        return 0
+
+    print(
+        f"{'case':<40} {'time (s)':>9} {'peak (MiB)':>10}"
+        f" {'faces':>10} {'volume':>10}"
+    )
+    results = runSuite(args.functions, args.modes, args.nSample)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    else:
+        print(f"no baseline found at {args.baseline}")
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(baseline, file, indent=1, sort_keys=True)
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(regression)
+    if regressions:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -2,7 +2,10 @@
 Boolean operations
 """
 
+import io
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 from typing import Union, Tuple, List
 
 import cadquery as cq
@@ -10,10 +13,20 @@ import numpy as np
 import pyvista as pv
 
 import OCP
+from OCP.BRep import BRep_Builder
 from OCP.BRepAlgoAPI import BRepAlgoAPI_Cut, BRepAlgoAPI_Fuse
+from OCP.BRepBuilderAPI import (
+    BRepBuilderAPI_MakeEdge,
+    BRepBuilderAPI_MakeFace,
+    BRepBuilderAPI_MakeVertex,
+)
+from OCP.BRepExtrema import BRepExtrema_DistShapeShape
+from OCP.gp import gp_Dir, gp_Pln, gp_Pnt
 from OCP.ShapeUpgrade import ShapeUpgrade_UnifySameDomain
+from OCP.TopoDS import TopoDS_Shell, TopoDS_Wire
+from OCP.TopTools import TopTools_ListOfShape
 
-from .phase import Phase
+from .phase import Phase, boundingBoxes, groupByCell, rasterSolids
 from .rve import Rve
 
 
@@ -129,20 +142,110 @@ def rescale(
     return shape
 
 
-def fuseShapes(cqShapeList: List[cq.Shape], retain_edges: bool) -> cq.Shape:
+def trianglesToShell(points: np.ndarray, triangles: np.ndarray) -> cq.Shell:
+    """
+    Builds a shell of planar faces from a triangle mesh in one pass
+
+    Each mesh vertex and each mesh edge is created once and shared by all the
+    faces using it, so the resulting shell is connected without sewing.
+    Degenerated triangles are skipped.
+
+    :param points: (n, 3) array of vertex coordinates
+    :param triangles: (m, 3) array of vertex indices of each triangle
+
+    :return: cq.Shell
+    """
+    points = np.asarray(points, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    n_points = len(points)
+
+    p0, p1, p2 = (points[triangles[:, i]] for i in range(3))
+    normals = np.cross(p1 - p0, p2 - p0)
+    areas = np.linalg.norm(normals, axis=1)
+    keep = areas > 1e-12 * max(1.0, np.ptp(points)) ** 2
+    triangles = triangles[keep]
+    normals = normals[keep] / areas[keep, None]
+    origins = p0[keep]
+
+    # unique edges, stored from the lowest to the highest vertex index
+    half_edges = np.stack([triangles, np.roll(triangles, -1, axis=1)], axis=-1)
+    half_edges = half_edges.reshape(-1, 2)
+    edge_min = half_edges.min(axis=1)
+    edge_max = half_edges.max(axis=1)
+    edge_keys, edge_index, edge_count = np.unique(
+        edge_min * n_points + edge_max, return_inverse=True, return_counts=True
+    )
+    edge_index = edge_index.reshape(-1, 3)
+    forward = (half_edges[:, 0] == edge_min).reshape(-1, 3)
+
+    vertices = [
+        BRepBuilderAPI_MakeVertex(gp_Pnt(*point)).Vertex()
+        for point in points.tolist()
+    ]
+    edges = [
+        BRepBuilderAPI_MakeEdge(
+            vertices[key // n_points], vertices[key % n_points]
+        ).Edge()
+        for key in edge_keys.tolist()
+    ]
+
+    builder = BRep_Builder()
+    shell = TopoDS_Shell()
+    builder.MakeShell(shell)
+    for tri_edges, tri_forward, normal, origin in zip(
+        edge_index.tolist(), forward.tolist(), normals.tolist(), origins.tolist()
+    ):
+        wire = TopoDS_Wire()
+        builder.MakeWire(wire)
+        for i_edge, is_forward in zip(tri_edges, tri_forward):
+            edge = edges[i_edge]
+            builder.Add(wire, edge if is_forward else edge.Reversed())
+        wire.Closed(True)
+        plane = gp_Pln(gp_Pnt(*origin), gp_Dir(*normal))
+        builder.Add(shell, BRepBuilderAPI_MakeFace(plane, wire, True).Face())
+    shell.Closed(bool(np.all(edge_count == 2)))
+
+    return cq.Shell(shell)
+
+
+def fuseShapes(
+    cqShapeList: List[cq.Shape], retain_edges: bool, workers: int = None
+) -> cq.Shape:
     """
     Fuse all shapes in cqShapeList
 
+    The shapes are grouped in the connected components of their overlap
+    graph (see :func:`overlapComponents`), the shapes of each component are
+    fused in a single general fuse operation, the first shape being the
+    argument and the others the tools, run in OCC parallel mode, and the
+    disjoint components are gathered in a compound.
+
+    With workers > 1, the shapes are sorted along a space filling curve and
+    fused by a balanced tree reduction: groups of neighbouring shapes, then
+    pairs of fused groups, are fused in parallel processes exchanging BRep
+    serialized shapes, and the last two parts are fused in this process.
+    The processes are spawned, a forked copy of the OCC thread pool used by
+    the parallel mode can deadlock.
+
     :param cqShapeList: list of shapes to fuse
     :param retain_edges: retain intersecting edges
+    :param workers: if given, number of processes fusing the subtrees of each component
 
     :return fused object
     """
 
-    occ_Solids = cqShapeList[0].wrapped
-    for i in range(1, len(cqShapeList)):
-        fuse = BRepAlgoAPI_Fuse(occ_Solids, cqShapeList[i].wrapped)
-        occ_Solids = fuse.Shape()
+    parts = []
+    for component in overlapComponents(cqShapeList):
+        shapes = [cqShapeList[i] for i in component]
+        if workers is not None and workers > 1 and len(shapes) > 2:
+            parts.append(_treeFuse(shapes, workers))
+        else:
+            parts.append(_generalFuse(shapes))
+    if len(parts) == 1:
+        occ_Solids = parts[0]
+    else:
+        compound = cq.Compound.makeCompound([cq.Shape(part) for part in parts])
+        occ_Solids = compound.wrapped
 
     if retain_edges:
         return cq.Shape(occ_Solids)
@@ -153,6 +256,216 @@ def fuseShapes(cqShapeList: List[cq.Shape], retain_edges: bool) -> cq.Shape:
         return cq.Shape(shape)
 
 
+def overlappingPairs(
+    boxes: np.ndarray, others: np.ndarray = None, tolerance: float = 1.0e-7
+) -> np.ndarray:
+    """
+    Returns the pairs of overlapping bounding boxes, found by a sweep along x
+
+    The boxes are visited by increasing min x. An active window holds the
+    boxes visited so far whose max x still reaches the min x of the current
+    box, the others are dropped from it for good, and the current box is only
+    tested against the window, so boxes spread along x are not compared to
+    all the others.
+
+    :param boxes: (n, 2, 3) array of min and max corners
+    :param others: (m, 2, 3) array of min and max corners, boxes are paired with each other if None
+    :param tolerance: gap under which two boxes are considered overlapping
+
+    :return: (p, 2) array of indices (i, j) of boxes and others (i < j if others is None), sorted
+    """
+    self_pairs = others is None
+    n_boxes = len(boxes)
+    corners = boxes if self_pairs else np.concatenate([boxes, others])
+    order = np.argsort(corners[:, 0, 0], kind="stable")
+    active = np.empty(0, dtype=np.int64)
+    pairs = []
+    for k in order.tolist():
+        box = corners[k]
+        active = active[corners[active, 1, 0] >= box[0, 0] - tolerance]
+        if self_pairs:
+            candidates = active
+        elif k < n_boxes:
+            candidates = active[active >= n_boxes]
+        else:
+            candidates = active[active < n_boxes]
+        overlap = np.all(
+            (corners[candidates, 0] <= box[1] + tolerance)
+            & (corners[candidates, 1] >= box[0] - tolerance),
+            axis=1,
+        )
+        for j in candidates[overlap].tolist():
+            if self_pairs:
+                pairs.append((min(j, k), max(j, k)))
+            elif k < n_boxes:
+                pairs.append((k, j - n_boxes))
+            else:
+                pairs.append((j, k - n_boxes))
+        active = np.append(active, k)
+    pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def overlapComponents(
+    cqShapeList: List[cq.Shape], tolerance: float = 1.0e-7
+) -> List[List[int]]:
+    """
+    Returns the connected components of the overlap graph of the shapes:
+    two shapes are linked if their bounding boxes overlap and if the distance
+    between them is not larger than tolerance
+
+    :param cqShapeList: list of shapes
+    :param tolerance: distance under which two shapes are considered in contact
+
+    :return: list of the indices of the shapes of each component
+    """
+    parent = list(range(len(cqShapeList)))
+
+    def root(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    if len(cqShapeList) > 1:
+        boxes = boundingBoxes(cqShapeList)
+        for i, j in overlappingPairs(boxes, tolerance=tolerance).tolist():
+            if root(i) == root(j):
+                continue
+            distance = BRepExtrema_DistShapeShape(
+                cqShapeList[i].wrapped, cqShapeList[j].wrapped
+            )
+            if distance.IsDone() and distance.Value() <= tolerance:
+                parent[root(i)] = root(j)
+
+    components = {}  # type: dict[int, list[int]]
+    for i in range(len(cqShapeList)):
+        components.setdefault(root(i), []).append(i)
+    return list(components.values())
+
+
+def _generalFuse(cqShapeList: List[cq.Shape]) -> OCP.TopoDS.TopoDS_Shape:
+    """
+    Fuses the shapes in one operation, the first shape being the argument
+    """
+    if len(cqShapeList) == 1:
+        return cqShapeList[0].wrapped
+    fuse = BRepAlgoAPI_Fuse()
+    fuse.SetArguments(_shapeList(cqShapeList[:1]))
+    fuse.SetTools(_shapeList(cqShapeList[1:]))
+    fuse.SetRunParallel(True)
+    fuse.Build()
+    return fuse.Shape()
+
+
+def _generalCut(shape: cq.Shape, tools: List[cq.Shape]) -> cq.Shape:
+    """
+    Cuts shape by all the tools in one operation
+    """
+    if len(tools) == 0:
+        return shape
+    cut = BRepAlgoAPI_Cut()
+    cut.SetArguments(_shapeList([shape]))
+    cut.SetTools(_shapeList(tools))
+    cut.SetRunParallel(True)
+    cut.Build()
+    return cq.Shape(cut.Shape())
+
+
+def _cutByUnion(shape: cq.Shape, tools: List[cq.Shape]) -> cq.Shape:
+    """
+    Cuts shape by the union of the tools, fused one by one in their order and
+    unified as in the sequential cut of all the previous shapes, so that the
+    faces left on the cut shape (on the periodic boundaries in particular)
+    are the same
+    """
+    if len(tools) == 0:
+        return shape
+    union = tools[0]
+    for tool in tools[1:]:
+        fuse = BRepAlgoAPI_Fuse(union.wrapped, tool.wrapped)
+        upgrader = ShapeUpgrade_UnifySameDomain(fuse.Shape(), True, True, True)
+        upgrader.Build()
+        union = cq.Shape(upgrader.Shape())
+    cut = BRepAlgoAPI_Cut(shape.wrapped, union.wrapped)
+    return cq.Shape(cut.Shape())
+
+
+def _shapeList(cqShapeList: List[cq.Shape]) -> TopTools_ListOfShape:
+    """
+    Converts a list of shapes to the list type of OCC boolean operations
+    """
+    occ_list = TopTools_ListOfShape()
+    for shape in cqShapeList:
+        occ_list.Append(shape.wrapped)
+    return occ_list
+
+
+def _toBrep(shape: cq.Shape) -> bytes:
+    stream = io.BytesIO()
+    shape.exportBrep(stream)
+    return stream.getvalue()
+
+
+def _fromBrep(data: bytes) -> cq.Shape:
+    return cq.Shape.importBrep(io.BytesIO(data))
+
+
+def _fuseBreps(breps: List[bytes]) -> bytes:
+    shapes = [_fromBrep(data) for data in breps]
+    return _toBrep(cq.Shape(_generalFuse(shapes)))
+
+
+# shapes of the cutting processes, sent once to each process
+_cut_worker = {}
+
+
+def _initCutWorker(breps: List[bytes]) -> None:
+    _cut_worker.update(shapes=[_fromBrep(data) for data in breps])
+
+
+def _cutWorkerShape(i: int, tools: List[int]) -> bytes:
+    shapes = _cut_worker["shapes"]
+    return _toBrep(_cutByUnion(shapes[i], [shapes[j] for j in tools]))
+
+
+def _spatialOrder(cqShapeList: List[cq.Shape]) -> np.ndarray:
+    """
+    Returns the indices of the shapes sorted along the Morton curve of the
+    centers of their bounding boxes
+    """
+    boxes = [shape.BoundingBox() for shape in cqShapeList]
+    centers = np.array([box.center.toTuple() for box in boxes])
+    span = np.maximum(np.ptp(centers, axis=0), 1.0e-12)
+    cells = ((centers - centers.min(axis=0)) / span * 1023).astype(np.int64)
+    codes = np.zeros(len(cqShapeList), dtype=np.int64)
+    for bit in range(10):
+        for axis in range(3):
+            codes |= ((cells[:, axis] >> bit) & 1) << (3 * bit + axis)
+    return np.argsort(codes, kind="stable")
+
+
+def _treeFuse(cqShapeList: List[cq.Shape], workers: int) -> OCP.TopoDS.TopoDS_Shape:
+    """
+    Fuses the shapes by a balanced tree reduction over a pool of processes
+    """
+    order = _spatialOrder(cqShapeList)
+    n_leaves = min(2 * workers, len(cqShapeList))
+    leaves = [
+        [_toBrep(cqShapeList[i]) for i in group]
+        for group in np.array_split(order, n_leaves)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        parts = list(executor.map(_fuseBreps, leaves))
+        while len(parts) > 2:
+            pairs = [parts[i : i + 2] for i in range(0, len(parts), 2)]
+            parts = list(executor.map(_fuseBreps, pairs))
+
+    return _generalFuse([_fromBrep(data) for data in parts])
+
+
 def cutPhasesByShape(phaseList: List[Phase], cut_obj: cq.Shape) -> List[Phase]:
     """
     Cuts list of phases by a given shape
@@ -175,6 +488,9 @@ def cutPhaseByShapeList(phaseToCut: Phase, cqShapeList: List[cq.Shape]) -> Phase
     """
     Cuts a phase by a list of shapes
 
+    The shapes whose bounding boxes do not overlap the one of the phase are
+    skipped, the phase is cut by the others in one operation.
+
     :param phaseToCut: phase to cut
     :param cqShapeList: list of cutting shapes
 
@@ -182,57 +498,80 @@ def cutPhaseByShapeList(phaseToCut: Phase, cqShapeList: List[cq.Shape]) -> Phase
     """
 
     resultCut = phaseToCut.shape
-    for shape in cqShapeList:
-        cut = BRepAlgoAPI_Cut(resultCut.wrapped, shape.wrapped)
-        resultCut = cq.Shape(cut.Shape())
+    if len(cqShapeList) > 0:
+        pairs = overlappingPairs(
+            boundingBoxes(cqShapeList), boundingBoxes([resultCut])
+        )
+        tools = [cqShapeList[i] for i in pairs[:, 0].tolist()]
+        if len(tools) > 0:
+            resultCut = _generalCut(resultCut, tools)
     return Phase(shape=resultCut)
 
 
-def cutShapes(cqShapeList: List[cq.Shape], reverseOrder: bool = True) -> List[cq.Shape]:
+def cutShapes(
+    cqShapeList: List[cq.Shape], reverseOrder: bool = True, workers: int = None
+) -> List[cq.Shape]:
     """
     Cuts list of shapes in the given order (or reverse) and fuse them.
 
+    Each shape is cut only by the union of the previous shapes whose
+    bounding boxes overlap its own (see :func:`overlappingPairs`), which
+    gives the same result as cutting it by the union of all the previous
+    shapes.
+    With workers > 1, the cuts are run in parallel spawned processes
+    exchanging BRep serialized shapes (see :func:`fuseShapes`).
+
     :param cqShapeList: list of CQ Shape to cut
     :param reverseOrder: bool, order for cutting shapes, when True: the last shape of the list is not cutted
+    :param workers: if given, number of processes running the cuts
 
     :return cutted_shapes: list of CQ Shape
     """
-    cutted_shapes = []  # type: list[cq.Shape]
     if reverseOrder:
         cqShapeList_inv = cqShapeList[::-1]
     else:
         cqShapeList_inv = cqShapeList
 
-    cut_shape = cqShapeList_inv[0].copy()
-    cutted_shapes.append(cut_shape)
-
-    for shape in cqShapeList_inv[1::]:
-        copy = shape.copy()
-        cut = BRepAlgoAPI_Cut(copy.wrapped, cut_shape.wrapped)
-        cutted_shapes.append(cq.Shape(cut.Shape()))
-
-        fuse = BRepAlgoAPI_Fuse(cut_shape.wrapped, shape.wrapped)
-        fused = fuse.Shape()
-        upgrader = ShapeUpgrade_UnifySameDomain(fused, True, True, True)
-        upgrader.Build()
-        cut_shape = cq.Shape(upgrader.Shape())
+    tools = [[] for _ in cqShapeList_inv]  # type: list[list[int]]
+    for i, j in overlappingPairs(boundingBoxes(cqShapeList_inv)).tolist():
+        tools[j].append(i)
+
+    if workers is not None and workers > 1 and len(cqShapeList) > 2:
+        breps = [_toBrep(shape) for shape in cqShapeList_inv]
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initCutWorker,
+            initargs=(breps,),
+        ) as executor:
+            cutted = executor.map(_cutWorkerShape, range(1, len(breps)), tools[1:])
+            cutted_shapes = [cqShapeList_inv[0].copy()]
+            cutted_shapes.extend(_fromBrep(data) for data in cutted)
+    else:
+        cutted_shapes = [
+            _cutByUnion(shape.copy(), [cqShapeList_inv[j] for j in shape_tools])
+            for shape, shape_tools in zip(cqShapeList_inv, tools)
+        ]
 
     cutted_shapes.reverse()
 
     return cutted_shapes
 
 
-def cutPhases(phaseList: List[Phase], reverseOrder: bool = True) -> List[Phase]:
+def cutPhases(
+    phaseList: List[Phase], reverseOrder: bool = True, workers: int = None
+) -> List[Phase]:
     """
     Cuts list of shapes in the given order (or reverse) and fuse them.
 
     :param phaseList: list of phases to cut
     :param reverseOrder: bool, order for cutting shapes, when True: the last shape of the list is not cutted
+    :param workers: if given, number of processes running the cuts (see :func:`cutShapes`)
 
     :return list of phases
     """
     shapeList = [phase.shape for phase in phaseList]
-    cutted_shapes = cutShapes(shapeList, reverseOrder)
+    cutted_shapes = cutShapes(shapeList, reverseOrder, workers)
 
     return [Phase(shape=shape) for shape in cutted_shapes]
 
@@ -286,6 +625,7 @@ def rasterPhase(
 ) -> Union[Phase, List[Phase]]:
     """
     Rasters solids from phase according to the rve divided by the given grid
+    (see :func:`~microgen.phase.rasterSolids`)
 
     :param phase: phase to raster
     :param rve: RVE divided by the given grid
@@ -294,41 +634,11 @@ def rasterPhase(
 
     :return: Phase or list of Phases
     """
-    solidList = []  # type: list[cq.Solid]
-
-    for solid in phase.solids:
-        wk_plane = cq.Workplane().add(solid)
-        xgrid = np.linspace(rve.x_min, rve.x_max, num=grid[0])
-        ygrid = np.linspace(rve.y_min, rve.y_max, num=grid[1])
-        zgrid = np.linspace(rve.z_min, rve.z_max, num=grid[2])
-        np.delete(xgrid, 0)
-        np.delete(ygrid, 0)
-        np.delete(zgrid, 0)
-        for i in xgrid:
-            Plane_x = cq.Face.makePlane(basePnt=(i, 0, 0), dir=(1, 0, 0))
-            wk_plane = wk_plane.split(cq.Workplane().add(Plane_x))
-        for j in ygrid:
-            Plane_y = cq.Face.makePlane(basePnt=(0, j, 0), dir=(0, 1, 0))
-            wk_plane = wk_plane.split(cq.Workplane().add(Plane_y))
-        for k in zgrid:
-            Plane_z = cq.Face.makePlane(basePnt=(0, 0, k), dir=(0, 0, 1))
-            wk_plane = wk_plane.split(cq.Workplane().add(Plane_z))
-
-        for subsolid in wk_plane.val().Solids():
-            solidList.append(subsolid)
+    solidList, cells = rasterSolids(phase.solids, rve, grid)
 
     if phasePerRaster:
-        solids_phases = [
-            [] for _ in range(grid[0] * grid[1] * grid[2])
-        ]  # type: list[list[cq.Solid]]
-        for solid in solidList:
-            center = solid.Center()
-            i = int(round((center.x - rve.x_min) / (rve.dx / grid[0])))
-            j = int(round((center.y - rve.y_min) / (rve.dy / grid[1])))
-            k = int(round((center.z - rve.z_min) / (rve.dz / grid[2])))
-            ind = i + grid[0] * j + grid[0] * grid[1] * k
-            solids_phases[ind].append(solid)
-        return [Phase(solids=solids) for solids in solids_phases if len(solids) > 0]
+        solids_phases = groupByCell(solidList, cells, grid)
+        return [Phase(solids=solids) for solids in solids_phases]
     else:
         return Phase(solids=solidList)
 
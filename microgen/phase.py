@@ -5,8 +5,10 @@ Phase class to manage list of solids belonging to the same phase
 import cadquery as cq
 import pyvista as pv
 import numpy as np
+from OCP.BRepAlgoAPI import BRepAlgoAPI_Splitter
 from OCP.BRepGProp import BRepGProp
 from OCP.GProp import GProp_GProps
+from OCP.TopTools import TopTools_ListOfShape
 
 from typing import Union, Tuple
 
@@ -195,42 +197,105 @@ class Phase:
 
         :return: list of Phases if required
         """
-        solidList = []  # type: list[cq.Solid]
-
-        for solid in self.solids:
-            wk_plane = cq.Workplane().add(solid)
-            xgrid = np.linspace(rve.x_min, rve.x_max, num=grid[0])
-            ygrid = np.linspace(rve.y_min, rve.y_max, num=grid[1])
-            zgrid = np.linspace(rve.z_min, rve.z_max, num=grid[2])
-            np.delete(xgrid, 0)
-            np.delete(ygrid, 0)
-            np.delete(zgrid, 0)
-            for i in xgrid:
-                Plane_x = cq.Face.makePlane(basePnt=(i, 0, 0), dir=(1, 0, 0))
-                wk_plane = wk_plane.split(cq.Workplane().add(Plane_x))
-            for j in ygrid:
-                Plane_y = cq.Face.makePlane(basePnt=(0, j, 0), dir=(0, 1, 0))
-                wk_plane = wk_plane.split(cq.Workplane().add(Plane_y))
-            for k in zgrid:
-                Plane_z = cq.Face.makePlane(basePnt=(0, 0, k), dir=(0, 0, 1))
-                wk_plane = wk_plane.split(cq.Workplane().add(Plane_z))
-
-            for subsolid in wk_plane.val().Solids():
-                solidList.append(subsolid)
+        solidList, cells = rasterSolids(self.solids, rve, grid)
 
         if not phasePerRaster:
             self._solids = solidList
             compound = cq.Compound.makeCompound(self._solids)
             self._shape = cq.Shape(compound.wrapped)
         else:
-            solids_phases = [
-                [] for _ in range(grid[0] * grid[1] * grid[2])
-            ]  # type: list[list[cq.Solid]]
-            for solid in solidList:
-                center = solid.Center()
-                i = int(round((center.x - rve.x_min) / (rve.dx / grid[0])))
-                j = int(round((center.y - rve.y_min) / (rve.dy / grid[1])))
-                k = int(round((center.z - rve.z_min) / (rve.dz / grid[2])))
-                ind = i + grid[0] * j + grid[0] * grid[1] * k
-                solids_phases[ind].append(solid)
-            return [Phase(solids=solids) for solids in solids_phases if len(solids) > 0]
+            solids_phases = groupByCell(solidList, cells, grid)
+            return [Phase(solids=solids) for solids in solids_phases]
+
+
+def rasterSolids(
+    solids: list[cq.Solid], rve: Rve, grid: list[int]
+) -> Tuple[list[cq.Solid], np.ndarray]:
+    """
+    Splits solids by the planes of the rve divided by the given grid
+
+    Each solid is split in one operation by all the grid planes crossing its
+    bounding box, the other planes are skipped. The pieces are assigned to
+    the grid cells containing the centers of their bounding boxes.
+
+    :param solids: list of solids to raster
+    :param rve: RVE divided by the given grid
+    :param grid: number of divisions in each direction [x, y, z]
+
+    :return: list of the pieces and (n, 3) array of the grid cell of each piece
+    """
+    planes = [
+        np.linspace(rve.x_min, rve.x_max, num=grid[0]),
+        np.linspace(rve.y_min, rve.y_max, num=grid[1]),
+        np.linspace(rve.z_min, rve.z_max, num=grid[2]),
+    ]
+
+    pieces = []  # type: list[cq.Solid]
+    for solid in solids:
+        lower, upper = boundingBoxes([solid])[0]
+        # infinite planes crossing each other do not all split the solid,
+        # use square faces covering its bounding box
+        size = 2.0 * float(np.max(upper - lower))
+        tools = TopTools_ListOfShape()
+        for axis, normal in enumerate(np.eye(3)):
+            positions = planes[axis]
+            crossing = (positions > lower[axis]) & (positions < upper[axis])
+            for position in positions[crossing].tolist():
+                base = 0.5 * (lower + upper)
+                base[axis] = position
+                plane = cq.Face.makePlane(
+                    size, size, basePnt=tuple(base), dir=tuple(normal)
+                )
+                tools.Append(plane.wrapped)
+        if tools.Size() == 0:
+            pieces.append(solid)
+            continue
+
+        arguments = TopTools_ListOfShape()
+        arguments.Append(solid.wrapped)
+        splitter = BRepAlgoAPI_Splitter()
+        splitter.SetArguments(arguments)
+        splitter.SetTools(tools)
+        splitter.SetRunParallel(True)
+        splitter.Build()
+        pieces.extend(cq.Shape(splitter.Shape()).Solids())
+
+    centers = boundingBoxes(pieces).mean(axis=1)
+    cells = np.stack(
+        [
+            np.clip(np.searchsorted(planes[axis], centers[:, axis]) - 1, 0, None)
+            for axis in range(3)
+        ],
+        axis=1,
+    )
+    return pieces, cells.reshape(-1, 3)
+
+
+def groupByCell(
+    solids: list[cq.Solid], cells: np.ndarray, grid: list[int]
+) -> list[list[cq.Solid]]:
+    """
+    Groups the solids by grid cell, in the order of the cell indices
+    (x varying fastest), empty cells being skipped
+    """
+    index = cells[:, 0] + grid[0] * (cells[:, 1] + grid[1] * cells[:, 2])
+    _, inverse = np.unique(index, return_inverse=True)
+    n_groups = inverse.max(initial=-1) + 1
+    groups = [[] for _ in range(n_groups)]  # type: list[list[cq.Solid]]
+    for solid, group in zip(solids, inverse.ravel().tolist()):
+        groups[group].append(solid)
+    return groups
+
+
+def boundingBoxes(cqShapeList: list[cq.Shape]) -> np.ndarray:
+    """
+    Returns the (n, 2, 3) array of min and max corners of the bounding boxes
+    of the shapes
+    """
+    boxes = [shape.BoundingBox() for shape in cqShapeList]
+    return np.array(
+        [
+            [[box.xmin, box.ymin, box.zmin], [box.xmax, box.ymax, box.zmax]]
+            for box in boxes
+        ]
+    ).reshape(-1, 2, 3)
@@ -92,6 +92,7 @@ def newGeometry(
             thickness=param_geom["thickness"],
             cell_size=param_geom["cell_size"],
             repeat_cell=param_geom["repeat_cell"],
+            repeat_mode=param_geom.get("repeat_mode", "copy"),
         )
     elif shape.lower() == "polyhedron":
         return Polyhedron(dic=param_geom["dic"])
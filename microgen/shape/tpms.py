@@ -9,12 +9,21 @@ TPMS (:mod:`microgen.shape.tpms`)
    pyvista.global_theme.smooth_shading = True
 
 """
+import io
+import mmap
+import multiprocessing
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from typing import Callable, Union
 
 import numpy as np
 import cadquery as cq
 import pyvista as pv
 from numpy import cos, pi, sin
+from OCP.ShapeFix import ShapeFix_Solid
+from vtkmodules.vtkFiltersCore import vtkDecimatePro
 
 # from OCP.StlAPI import StlAPI_Reader
 # from OCP.TopoDS import TopoDS_Shape
@@ -35,11 +44,777 @@ from numpy import cos, pi, sin
 #     BRepBuilderAPI_MakeSolid,
 # )
 
-from ..operations import fuseShapes, rescale, repeatShape, repeatPolyData
+from ..operations import (
+    fuseShapes,
+    repeatShape,
+    repeatPolyData,
+    trianglesToShell,
+)
 from ..rve import Rve
 from .basicGeometry import BasicGeometry
 
 
+FIELD_NAME = "surface_function"
+
+# floating point type of the sampled fields when Tpms is not given a dtype
+default_dtype = np.float64
+
+
+class FieldCache:
+    """
+    Least recently used cache of sampled TPMS fields
+
+    Fields are stored as pv.DataSet with the sampled values in the
+    :data:`FIELD_NAME` point array, keyed by (surface_function, nSample,
+    domain). The memory used by the stored fields is bounded by max_bytes,
+    the least recently used fields are evicted first. Each field counts for
+    the memory of its whole dataset when it is stored (actual_memory_size),
+    points and cells of unstructured grids included.
+
+    :param max_bytes: maximum memory used by the cached fields (in bytes)
+    """
+
+    def __init__(self, max_bytes: int = 512 * 2**20) -> None:
+        self.max_bytes = max_bytes
+        self._grids = OrderedDict()  # type: OrderedDict[tuple, pv.DataSet]
+        self._sizes = {}  # type: dict[tuple, int]
+        self._nbytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._grids)
+
+    def get(self, key: tuple) -> Union[pv.DataSet, None]:
+        grid = self._grids.get(key)
+        if grid is not None:
+            self._grids.move_to_end(key)
+        return grid
+
+    def put(self, key: tuple, grid: pv.DataSet) -> None:
+        # actual_memory_size is in kibibytes
+        nbytes = grid.actual_memory_size * 1024
+        if nbytes > self.max_bytes:
+            return
+        if key in self._grids:
+            del self._grids[key]
+            self._nbytes -= self._sizes.pop(key)
+        self._grids[key] = grid
+        self._sizes[key] = nbytes
+        self._nbytes += nbytes
+        self.resize(self.max_bytes)
+
+    def resize(self, max_bytes: int) -> None:
+        """
+        Sets the memory bound of the cache, evicting fields if needed
+
+        :param max_bytes: maximum memory used by the cached fields (in bytes)
+        """
+        self.max_bytes = max_bytes
+        while self._nbytes > self.max_bytes:
+            key, _ = self._grids.popitem(last=False)
+            self._nbytes -= self._sizes.pop(key)
+
+    def clear(self) -> None:
+        self._grids.clear()
+        self._sizes.clear()
+        self._nbytes = 0
+
+
+field_cache = FieldCache()
+
+
+def sampleField(
+    surface_function: Callable[[float, float, float], float],
+    nSample: int = 20,
+    origin: tuple[float, float, float] = (-0.5, -0.5, -0.5),
+    size: tuple[float, float, float] = (1.0, 1.0, 1.0),
+    memory_budget: int = None,
+    memmap_dir: str = None,
+    dtype: np.dtype = None,
+    workers: int = None,
+) -> pv.UniformGrid:
+    """
+    Samples surface_function on a uniform grid covering the given domain
+
+    Functions of :data:`separable_functions` are evaluated on the 1D grid axes
+    and broadcast to 3D, other functions are evaluated on the grid points.
+    The grid is shared through :data:`field_cache`, it must not be modified.
+
+    :param surface_function: tpms function or custom function
+    :param nSample: number of samples in each direction per unit length
+    :param origin: lower corner of the domain
+    :param size: dimensions of the domain
+    :param memory_budget: if given, the field is evaluated by z slabs so that the temporary arrays fit in this budget (in bytes)
+    :param memmap_dir: if given, the field is stored in a np.memmap backed by a temporary file in this directory
+    :param dtype: floating point type of the coordinates and of the field, :data:`default_dtype` if None
+    :param workers: if given, number of processes evaluating the field
+
+    :return: pv.UniformGrid with the sampled field in the FIELD_NAME array
+    """
+    dtype = np.dtype(default_dtype if dtype is None else dtype)
+    key = (surface_function, nSample, tuple(origin), tuple(size), dtype)
+    grid = field_cache.get(key)
+    if grid is not None:
+        return grid
+
+    spacing = 1.0 / (nSample - 1)
+    dims = tuple(int(round(length / spacing)) + 1 for length in size)
+    grid = pv.UniformGrid(
+        dims=dims,
+        spacing=(spacing, spacing, spacing),
+        origin=origin,
+    )
+    grid.point_data[FIELD_NAME] = evaluateField(
+        surface_function,
+        origin=origin,
+        spacing=spacing,
+        dims=dims,
+        memory_budget=memory_budget,
+        memmap_dir=memmap_dir,
+        dtype=dtype,
+        workers=workers,
+    )
+
+    field_cache.put(key, grid)
+    return grid
+
+
+def evaluateField(
+    surface_function: Callable[[float, float, float], float],
+    origin: tuple[float, float, float],
+    spacing: float,
+    dims: tuple[int, int, int],
+    memory_budget: int = None,
+    memmap_dir: str = None,
+    dtype: np.dtype = np.float64,
+    workers: int = None,
+) -> np.ndarray:
+    """
+    Evaluates surface_function on the points of a uniform grid, in the VTK
+    point order (x varying fastest)
+
+    The field is written slab by slab along z in a preallocated buffer. The
+    slab thickness is chosen so that the coordinates and the temporaries of
+    the evaluation of one slab fit in memory_budget.
+
+    With workers > 1, the slabs are evaluated by a pool of forked processes
+    writing directly into the buffer, allocated in shared memory (an
+    anonymous shared mapping, or the np.memmap if memmap_dir is given), so
+    the result is not copied back. Where processes cannot be forked
+    (Windows), the field is evaluated in the current process.
+
+    :param surface_function: tpms function or custom function
+    :param origin: coordinates of the first grid point
+    :param spacing: distance between two grid points
+    :param dims: number of grid points in each direction
+    :param memory_budget: memory allowed for the evaluation of the slabs (in bytes, shared between the workers), the whole grid is evaluated at once if None
+    :param memmap_dir: if given, the buffer is a np.memmap backed by a temporary file in this directory
+    :param dtype: floating point type of the coordinates and of the field
+    :param workers: number of processes evaluating the field
+
+    :return: 1D array of the field values
+    """
+    dtype = np.dtype(dtype)
+    n_x, n_y, n_z = dims
+    n_points = n_x * n_y * n_z
+    if workers is not None and "fork" not in multiprocessing.get_all_start_methods():
+        workers = None
+    if memmap_dir is not None:
+        with tempfile.TemporaryFile(dir=memmap_dir) as file:
+            buffer = np.memmap(file, dtype=dtype, mode="w+", shape=(n_points,))
+    elif workers is not None and workers > 1:
+        shared = mmap.mmap(-1, max(1, n_points * dtype.itemsize))
+        buffer = np.frombuffer(shared, dtype=dtype, count=n_points)
+    else:
+        buffer = np.empty(n_points, dtype=dtype)
+
+    separable = surface_function in separable_functions
+    axes = tuple(
+        (origin[i] + spacing * np.arange(dims[i])).astype(dtype) for i in range(3)
+    )
+
+    slab = n_z
+    if memory_budget is not None:
+        # approximate number of temporaries per grid point
+        n_temporaries = 8 if separable else 12
+        slab_bytes = dtype.itemsize * n_temporaries * n_x * n_y
+        slab_bytes *= 1 if workers is None else max(1, workers)
+        slab = max(1, min(n_z, memory_budget // slab_bytes))
+
+    if workers is None or workers <= 1:
+        _fillSlabs(buffer, surface_function, axes, range(0, n_z), slab)
+        return buffer
+
+    # several slabs per worker to balance the load
+    n_tasks = min(n_z, 4 * workers)
+    bounds = np.linspace(0, n_z, n_tasks + 1).astype(int)
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_initFieldWorker,
+        initargs=(buffer, surface_function, axes, slab),
+    ) as executor:
+        for _ in executor.map(_fillWorkerSlabs, bounds[:-1], bounds[1:]):
+            pass
+
+    return buffer
+
+
+def _fillSlabs(
+    buffer: np.ndarray,
+    surface_function: Callable[[float, float, float], float],
+    axes: tuple[np.ndarray, np.ndarray, np.ndarray],
+    k_range: range,
+    slab: int,
+) -> None:
+    """
+    Writes the field of the z planes of k_range in buffer, slab planes at a time
+    """
+    x, y, z = axes
+    n_x, n_y = len(x), len(y)
+    separable = surface_function in separable_functions
+    for k in range(k_range.start, k_range.stop, slab):
+        z_slab = z[k : min(k + slab, k_range.stop)]
+        n_slab = len(z_slab)
+        values = buffer[k * n_x * n_y : (k + n_slab) * n_x * n_y]
+        values = values.reshape((n_x, n_y, n_slab), order="F")
+        if separable:
+            values[...] = surface_function(
+                x[:, None, None], y[None, :, None], z_slab[None, None, :]
+            )
+        else:
+            points = np.meshgrid(x, y, z_slab, indexing="ij")
+            values[...] = surface_function(*points)
+
+
+# state of the field evaluation processes, inherited when they are forked
+_field_worker = {}
+
+
+def _initFieldWorker(
+    buffer: np.ndarray,
+    surface_function: Callable[[float, float, float], float],
+    axes: tuple[np.ndarray, np.ndarray, np.ndarray],
+    slab: int,
+) -> None:
+    _field_worker.update(
+        buffer=buffer, surface_function=surface_function, axes=axes, slab=slab
+    )
+
+
+def _fillWorkerSlabs(k_start: int, k_stop: int) -> None:
+    _fillSlabs(
+        _field_worker["buffer"],
+        _field_worker["surface_function"],
+        _field_worker["axes"],
+        range(k_start, k_stop),
+        _field_worker["slab"],
+    )
+
+
+def buildShapes(
+    build: Callable[..., cq.Shape], args: list[tuple], workers: int = None
+) -> list[cq.Shape]:
+    """
+    Calls build(*args[i]) for each tuple of arguments, in a pool of spawned
+    processes if workers > 1
+
+    The processes are spawned rather than forked: OCC boolean operations run
+    with SetRunParallel start a thread pool, and a forked copy of a process
+    using it can deadlock. build and args are therefore pickled, build must
+    be defined at module level. The shapes are sent back to the parent
+    process serialized as BRep.
+
+    :param build: function building a shape from one tuple of arguments
+    :param args: list of the tuples of arguments, one per shape
+    :param workers: number of processes building the shapes
+
+    :return: list of the shapes, in the order of args
+    """
+    if workers is None or workers <= 1 or len(args) <= 1:
+        return [build(*arguments) for arguments in args]
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(args)), mp_context=context
+    ) as executor:
+        data = list(executor.map(_buildBrep, [build] * len(args), args))
+
+    return [cq.Shape.importBrep(io.BytesIO(brep)) for brep in data]
+
+
+def _buildBrep(build: Callable[..., cq.Shape], args: tuple) -> bytes:
+    stream = io.BytesIO()
+    build(*args).exportBrep(stream)
+    return stream.getvalue()
+
+
+def _generateTpms(tpms: "Tpms", kwargs: dict) -> cq.Shape:
+    return tpms.generate(**kwargs)
+
+
+def generateBatch(tpms_list: list, workers: int = None, **kwargs) -> list[cq.Shape]:
+    """
+    Generates several Tpms, for instance the geometries of a parameter sweep,
+    in parallel processes (see :func:`buildShapes`)
+
+    The Tpms are pickled to the processes, so their surface functions and
+    fields must be arrays or functions defined at module level.
+
+    :param tpms_list: list of Tpms instances
+    :param workers: number of processes generating the geometries
+    :param kwargs: arguments of :meth:`Tpms.generate`
+
+    :return: list of the generated shapes, in the order of tpms_list
+    """
+    return buildShapes(_generateTpms, [(tpms, kwargs) for tpms in tpms_list], workers)
+
+
+# corners of a VTK_VOXEL, x varying fastest
+VOXEL_CORNERS = np.array(
+    [[i, j, k] for k in range(2) for j in range(2) for i in range(2)], dtype=np.int64
+)
+
+
+def sampleAdaptive(
+    surface_function: Callable[[float, float, float], float],
+    isovalues: list[float],
+    nSample: int = 20,
+    levels: int = 2,
+    origin: tuple[float, float, float] = (-0.5, -0.5, -0.5),
+    size: tuple[float, float, float] = (1.0, 1.0, 1.0),
+    dtype: np.dtype = None,
+) -> pv.UnstructuredGrid:
+    """
+    Samples surface_function on an octree refined only around the isovalues
+
+    The domain is first sampled with nSample points per unit length. Cells
+    where the field may cross one of the isovalues are split in 8, down to
+    the given number of levels, and the field is only evaluated at the
+    corners of the split cells. A cell may cross an isovalue if the isovalue
+    is within the range of its corner values, widened by the largest field
+    variation over half a cell diagonal, estimated from the coarse grid.
+
+    All the cells kept are at the finest level and share their corners, so
+    the contour of the returned grid has no cracks. It has the resolution of
+    a uniform grid with (nSample - 1) * 2**levels + 1 points per unit length
+    without evaluating the field far from the isovalues.
+
+    :param surface_function: tpms function or custom function
+    :param isovalues: isovalues around which the octree is refined
+    :param nSample: number of samples per unit length of the coarse grid
+    :param levels: number of refinement levels
+    :param origin: lower corner of the domain
+    :param size: dimensions of the domain
+    :param dtype: floating point type of the field, :data:`default_dtype` if None
+
+    :return: pv.UnstructuredGrid of voxels with the field in the FIELD_NAME array
+    """
+    dtype = np.dtype(default_dtype if dtype is None else dtype)
+    key = ("adaptive", surface_function, nSample, levels, tuple(isovalues))
+    key += (tuple(origin), tuple(size), dtype)
+    grid = field_cache.get(key)
+    if grid is not None:
+        return grid
+
+    coarse = sampleField(surface_function, nSample, origin, size, dtype=dtype)
+    n_points = np.array(coarse.dimensions, dtype=np.int64)
+    spacing = coarse.spacing[0]
+    field = np.asarray(coarse[FIELD_NAME]).reshape(n_points, order="F")
+    slope = max(np.abs(np.diff(field, axis=axis)).max() for axis in range(3))
+    slope /= spacing
+    isovalues = np.asarray(isovalues, dtype=np.float64)
+
+    def crossing(values: np.ndarray, spacing: float) -> np.ndarray:
+        margin = slope * spacing * np.sqrt(3.0) / 2.0
+        low = values.min(axis=1)[:, None] - margin
+        high = values.max(axis=1)[:, None] + margin
+        return np.any((low <= isovalues) & (isovalues <= high), axis=1)
+
+    cells = np.stack(
+        np.meshgrid(*(np.arange(n - 1) for n in n_points), indexing="ij"), axis=-1
+    ).reshape(-1, 3)
+    corners = cells[:, None, :] + VOXEL_CORNERS
+    values = field[corners[..., 0], corners[..., 1], corners[..., 2]]
+    cells = cells[crossing(values, spacing)]
+
+    for _ in range(levels):
+        spacing /= 2.0
+        n_points = 2 * n_points - 1
+        cells = (2 * cells[:, None, :] + VOXEL_CORNERS).reshape(-1, 3)
+        keys = _pointKeys(cells[:, None, :] + VOXEL_CORNERS, n_points)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        points = _keysToPoints(unique_keys, n_points, origin, spacing, dtype)
+        values = np.asarray(surface_function(*points.T), dtype=dtype)
+        values = values[inverse.reshape(-1, 8)]
+        cells = cells[crossing(values, spacing)]
+
+    keys = _pointKeys(cells[:, None, :] + VOXEL_CORNERS, n_points)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    points = _keysToPoints(unique_keys, n_points, origin, spacing, dtype)
+    connectivity = np.hstack(
+        [np.full((len(cells), 1), 8, dtype=np.int64), inverse.reshape(-1, 8)]
+    )
+    grid = pv.UnstructuredGrid(
+        connectivity.ravel(),
+        np.full(len(cells), pv.CellType.VOXEL, dtype=np.uint8),
+        points,
+    )
+    grid.point_data[FIELD_NAME] = np.asarray(surface_function(*points.T), dtype=dtype)
+
+    field_cache.put(key, grid)
+    return grid
+
+
+def _pointKeys(points: np.ndarray, n_points: np.ndarray) -> np.ndarray:
+    """
+    Encodes integer grid coordinates into unique integer keys
+    """
+    return (points[..., 2] * n_points[1] + points[..., 1]) * n_points[0] + points[
+        ..., 0
+    ]
+
+
+def _keysToPoints(
+    keys: np.ndarray,
+    n_points: np.ndarray,
+    origin: tuple[float, float, float],
+    spacing: float,
+    dtype: np.dtype,
+) -> np.ndarray:
+    """
+    Decodes integer keys into point coordinates
+    """
+    i = keys % n_points[0]
+    j = (keys // n_points[0]) % n_points[1]
+    k = keys // (n_points[0] * n_points[1])
+    points = np.asarray(origin) + spacing * np.stack([i, j, k], axis=1)
+    return points.astype(dtype)
+
+
+class NormalizedFunction:
+    """
+    Function f / |grad f|, first order approximation of the signed distance
+    to the surface f = 0, so that its isovalues are offsets of the surface
+    along its normals
+
+    :param surface_function: tpms function or custom function
+    :param gradient: gradient of surface_function, returning the three components
+    """
+
+    def __init__(
+        self,
+        surface_function: Callable[[float, float, float], float],
+        gradient: Callable[[float, float, float], tuple[float, float, float]],
+    ) -> None:
+        self.surface_function = surface_function
+        self.gradient = gradient
+
+    def __call__(self, x: float, y: float, z: float) -> float:
+        gx, gy, gz = self.gradient(x, y, z)
+        norm = np.sqrt(gx * gx + gy * gy + gz * gz)
+        return self.surface_function(x, y, z) / np.maximum(norm, 1.0e-12)
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, NormalizedFunction)
+            and self.surface_function == other.surface_function
+            and self.gradient == other.gradient
+        )
+
+    def __hash__(self) -> int:
+        return hash((NormalizedFunction, self.surface_function, self.gradient))
+
+
+class SampledField:
+    """
+    Trilinear interpolation of values sampled on a uniform grid, used to give
+    a thickness or cell size field as an array
+
+    :param values: (nx, ny, nz) array of values at the grid points, indexed by x, y and z
+    :param bounds: (3, 2) array of min and max coordinates covered by the grid
+    """
+
+    def __init__(self, values: np.ndarray, bounds: np.ndarray) -> None:
+        self.values = np.asarray(values, dtype=np.float64)
+        if self.values.ndim != 3 or min(self.values.shape) < 2:
+            raise ValueError(
+                "a sampled field must be a 3D array of at least 2 points per axis"
+            )
+        self.bounds = np.asarray(bounds, dtype=np.float64)
+
+    def __call__(self, x: float, y: float, z: float) -> float:
+        shape = np.array(self.values.shape)
+        x, y, z = np.broadcast_arrays(x, y, z)
+        coords = np.stack([x, y, z], axis=-1)
+        index = (coords - self.bounds[:, 0]) / (self.bounds[:, 1] - self.bounds[:, 0])
+        index = np.clip(index * (shape - 1), 0, shape - 1)
+        lower = np.minimum(index.astype(np.int64), shape - 2)
+        weight = index - lower
+
+        result = 0.0
+        for corner in np.ndindex(2, 2, 2):
+            corner = np.array(corner)
+            i, j, k = np.moveaxis(lower + corner, -1, 0)
+            factor = np.prod(np.where(corner, weight, 1.0 - weight), axis=-1)
+            result = result + factor * self.values[i, j, k]
+        return result
+
+
+class GradedFunction:
+    """
+    TPMS function with a thickness and a cell size varying in space
+
+    The surface function is evaluated at (x, y, z) / cell_size_field, so that
+    the local period is scaled by the cell size field. If thickness_field is
+    given, it is divided by thickness * thickness_field, so that the part
+    abs(f) < thickness * thickness_field is bounded by the isovalues -1 and 1.
+
+    :param surface_function: tpms function, or thickening function of the tpms (see :class:`NormalizedFunction`)
+    :param thickness_field: function giving the local thickness, constant thickness if None
+    :param cell_size_field: function giving the local cell size relative to the unit cell, constant cell size if None
+    :param thickness: factor between the thickness field and the bound of surface_function (pi for the isovalue thickening, 0.5 for the normal thickening)
+    :param distance: True if surface_function is a distance, which is then scaled by the cell size field
+    """
+
+    def __init__(
+        self,
+        surface_function: Callable[[float, float, float], float],
+        thickness_field: Callable[[float, float, float], float] = None,
+        cell_size_field: Callable[[float, float, float], float] = None,
+        thickness: float = 1.0,
+        distance: bool = False,
+    ) -> None:
+        self.surface_function = surface_function
+        self.thickness_field = thickness_field
+        self.cell_size_field = cell_size_field
+        self.thickness = thickness
+        self.distance = distance
+
+    def __call__(self, x: float, y: float, z: float) -> float:
+        if self.cell_size_field is None:
+            value = self.surface_function(x, y, z)
+        else:
+            cell_size = self.cell_size_field(x, y, z)
+            value = self.surface_function(x / cell_size, y / cell_size, z / cell_size)
+            if self.distance:
+                value = value * cell_size
+        if self.thickness_field is None:
+            return value
+        return value / (self.thickness * self.thickness_field(x, y, z))
+
+    def _key(self) -> tuple:
+        return (
+            self.surface_function,
+            id(self.thickness_field),
+            id(self.cell_size_field),
+            self.thickness,
+            self.distance,
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, GradedFunction) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash((GradedFunction,) + self._key())
+
+
+def smoothSurface(
+    mesh: pv.PolyData,
+    n_iter: int = 100,
+    method: str = "taubin",
+    bounds: Union[np.ndarray, None] = None,
+    relaxation: float = 0.5,
+    pass_band: float = 0.1,
+) -> pv.PolyData:
+    """
+    Smoothes a triangulated surface with the Laplacian (vtkSmoothPolyDataFilter)
+    or windowed sinc Taubin (vtkWindowedSincPolyDataFilter) filter of VTK
+
+    'vtk' is the plain pyvista smooth with its default parameters, boundary
+    vertices included. With 'laplacian' and 'taubin', the boundary vertices
+    of the surface are not smoothed. With every method, vertices lying on the
+    faces of bounds are put back at their initial position, so that the
+    surfaces of neighbouring cells still match
+
+    :param mesh: triangulated surface
+    :param n_iter: smoothing loop iterations
+    :param method: 'vtk' (pyvista smooth), 'laplacian' or 'taubin'
+    :param bounds: (3, 2) array of min and max of the cell, vertices lying on its faces are fixed
+    :param relaxation: factor applied to the Laplacian displacement
+    :param pass_band: pass band of the windowed sinc filter
+    """
+    if method == "vtk":
+        smoothed = mesh.smooth(n_iter=n_iter)
+    elif method == "laplacian":
+        smoothed = mesh.smooth(
+            n_iter=n_iter, relaxation_factor=relaxation, boundary_smoothing=False
+        )
+    elif method == "taubin":
+        smoothed = mesh.smooth_taubin(
+            n_iter=n_iter, pass_band=pass_band, boundary_smoothing=False
+        )
+    else:
+        raise ValueError("method must be 'vtk', 'laplacian' or 'taubin'")
+
+    if bounds is not None:
+        bounds = np.asarray(bounds)
+        on_min = np.isclose(mesh.points, bounds[:, 0])
+        on_max = np.isclose(mesh.points, bounds[:, 1])
+        on_bounds = np.any(on_min | on_max, axis=1)
+        points = smoothed.points.copy()
+        points[on_bounds] = mesh.points[on_bounds]
+        smoothed.points = points
+    return smoothed
+
+
+def decimateSurface(
+    mesh: pv.PolyData,
+    max_triangles: int = None,
+    max_deviation: float = None,
+    feature_angle: float = 45.0,
+) -> pv.PolyData:
+    """
+    Reduces the number of triangles of a surface with vtkDecimatePro, down to
+    max_triangles or as long as the deviation stays below max_deviation
+
+    The topology is preserved and boundary vertices are never deleted, so the
+    polylines where the surface meets the cell faces are kept unchanged,
+    which may keep more triangles than max_triangles.
+    The deviation is measured as the largest distance from the original
+    vertices to the decimated surface, the reduction is bisected until it
+    stays below max_deviation
+
+    :param mesh: triangulated surface
+    :param max_triangles: target number of triangles of the decimated surface
+    :param max_deviation: maximum distance between the decimated and the original surface
+    :param feature_angle: angle between faces above which an edge is a feature edge
+    """
+    if max_triangles is None and max_deviation is None:
+        raise ValueError("max_triangles or max_deviation must be given")
+    if not mesh.is_all_triangles:
+        mesh = mesh.triangulate()
+
+    decimate = vtkDecimatePro()
+    decimate.SetInputData(mesh)
+    decimate.PreserveTopologyOn()
+    decimate.SplittingOff()
+    decimate.BoundaryVertexDeletionOff()
+    decimate.SetFeatureAngle(feature_angle)
+
+    def reduce(reduction: float) -> pv.PolyData:
+        decimate.SetTargetReduction(reduction)
+        decimate.Update()
+        return pv.PolyData(decimate.GetOutput()).copy()
+
+    if max_triangles is not None and mesh.n_faces > 0:
+        reduction = min(1.0, max(0.0, 1.0 - max_triangles / mesh.n_faces))
+    else:
+        reduction = 1.0
+    decimated = reduce(reduction)
+    if max_deviation is None:
+        return decimated
+
+    def deviation(surface: pv.PolyData) -> float:
+        distance = mesh.compute_implicit_distance(surface)["implicit_distance"]
+        return float(np.max(np.abs(distance)))
+
+    if deviation(decimated) <= max_deviation:
+        return decimated
+
+    best, low, high = mesh, 0.0, reduction
+    for _ in range(8):
+        middle = 0.5 * (low + high)
+        candidate = reduce(middle)
+        if deviation(candidate) <= max_deviation:
+            best, low = candidate, middle
+        else:
+            high = middle
+    return best
+
+
+def volumeFractionToThickness(
+    surface_function: Callable[[float, float, float], float],
+    volume_fraction: float,
+    type_part: str = "sheet",
+    nSample: int = 50,
+    thickening: str = "isovalue",
+    gradient: Callable[[float, float, float], tuple[float, float, float]] = None,
+) -> tuple[float, list[float]]:
+    """
+    Computes the thickness giving the requested volume fraction of the sheet
+    or skeletal part of one unit cell, without building any geometry
+
+    The volume fraction of the band abs(f) < t is the cumulative distribution
+    of abs(f) over the cell, estimated from the sampled field with trapezoidal
+    weights, so the thickness is a weighted quantile of abs(f)
+
+    :param surface_function: tpms function or custom function
+    :param volume_fraction: target volume fraction of the part, between 0 and 1
+    :param type_part: 'sheet' or 'skeletal'
+    :param nSample: number of samples in each direction of the unit cell
+    :param thickening: 'isovalue' or 'normal', as in :class:`Tpms`
+    :param gradient: gradient of surface_function, used by thickening='normal'
+
+    :return: thickness to give to :class:`Tpms` and the isovalues bounding the part
+    """
+    if not 0 < volume_fraction < 1:
+        raise ValueError("volume_fraction must be between 0 and 1")
+    if type_part != "sheet" and type_part != "skeletal":
+        raise ValueError("type_part must be 'sheet' or 'skeletal'")
+
+    field_function = _thickeningFunction(surface_function, thickening, gradient)
+    grid = sampleField(field_function, nSample)
+    values = np.abs(np.asarray(grid.point_data[FIELD_NAME], dtype=np.float64))
+
+    weights_1d = np.ones(nSample)
+    weights_1d[[0, -1]] = 0.5
+    weights = (
+        weights_1d[None, None, :] * weights_1d[None, :, None] * weights_1d[:, None, None]
+    ).ravel()
+
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order])
+    cumulative /= cumulative[-1]
+    if type_part == "sheet":
+        target = volume_fraction
+    else:
+        target = 1.0 - volume_fraction
+    isovalue = float(np.interp(target, cumulative, values[order]))
+
+    if thickening == "isovalue":
+        thickness = isovalue / np.pi
+    else:
+        thickness = 2.0 * isovalue
+    return thickness, [-isovalue, isovalue]
+
+
+def _thickeningFunction(
+    surface_function: Callable[[float, float, float], float],
+    thickening: str,
+    gradient: Callable[[float, float, float], tuple[float, float, float]] = None,
+) -> Callable[[float, float, float], float]:
+    """
+    Returns the function whose isovalues bound the thick part for the given
+    thickening mode ('isovalue' or 'normal')
+    """
+    if thickening == "isovalue":
+        return surface_function
+    if thickening == "normal":
+        if gradient is None:
+            gradient = surface_gradients.get(surface_function)
+        if gradient is None:
+            raise ValueError(
+                "thickening='normal' needs the gradient of surface_function"
+            )
+        return NormalizedFunction(surface_function, gradient)
+    raise ValueError("thickening must be 'isovalue' or 'normal'")
+
+
 class Tpms(BasicGeometry):
     """
     Class to generate Triply Periodical Minimal Surfaces (TPMS)
@@ -66,6 +841,16 @@ class Tpms(BasicGeometry):
         thickness: float = 0,
         cell_size: Union[float, tuple[float, float, float]] = (1, 1, 1),
         repeat_cell: Union[int, tuple[int, int, int]] = (1, 1, 1),
+        repeat_mode: str = "copy",
+        memory_budget: int = None,
+        memmap_dir: str = None,
+        dtype: np.dtype = None,
+        refinement: int = 0,
+        workers: int = None,
+        thickening: str = "isovalue",
+        gradient: Callable[[float, float, float], tuple[float, float, float]] = None,
+        thickness_field: Union[Callable[[float, float, float], float], np.ndarray] = None,
+        cell_size_field: Union[Callable[[float, float, float], float], np.ndarray] = None,
     ) -> None:
         """
         :param center: center of the geometry
@@ -75,6 +860,16 @@ class Tpms(BasicGeometry):
         :param thickness: thickness of the tpms
         :param cell_size: By default, the tpms is generated for (1, 1, 1) dimensions but this can be modified by passing 'cell_size' scaling parameter (float or list of float for each dimension)
         :param repeat_cell: By default, the tpms is generated for one unit_cell. 'repeat_cell' parameter allows to repeat the geometry in the three dimensions
+        :param repeat_mode: 'copy' to generate one unit cell and copy it, or 'field' to sample the function over the whole repeated domain and generate a single seamless geometry
+        :param memory_budget: memory allowed for the evaluation of the field (in bytes), the field is evaluated slab by slab to fit in it
+        :param memmap_dir: if given, the sampled field is stored in a np.memmap backed by a temporary file in this directory
+        :param dtype: floating point type used to sample and contour the field (np.float32 halves the memory), :data:`default_dtype` if None
+        :param refinement: number of octree levels refined around the isosurfaces (see :func:`sampleAdaptive`), surfaces are contoured on a uniform grid if 0
+        :param workers: if given, number of processes evaluating the field on the uniform grid and converting the surfaces of the isovalues to BRep (see :func:`buildShapes`)
+        :param thickening: 'isovalue' to bound the part by the isovalues -thickness * pi and thickness * pi of surface_function (the wall thickness varies with the gradient), or 'normal' to offset the surface by thickness / 2 along its normals, by contouring surface_function / abs(gradient) (see :class:`NormalizedFunction`)
+        :param gradient: gradient of surface_function, used by thickening='normal', taken from :data:`surface_gradients` for the available functions
+        :param thickness_field: if given, thickness varying in space replacing thickness, function of the coordinates of the sampled domain (centered on the origin, in unit cells) or array sampled on a uniform grid over this domain (see :class:`GradedFunction`)
+        :param cell_size_field: if given, local cell size relative to the unit cell, function of the coordinates of the sampled domain or array sampled on a uniform grid over this domain, cell_size still scales the whole geometry
         """
         super().__init__(shape="TPMS", center=center, orientation=orientation)
 
@@ -84,7 +879,14 @@ class Tpms(BasicGeometry):
             raise ValueError("type_part must be 'sheet' or 'skeletal'")
         self.type_part = type_part
 
-        self.thickness = thickness * np.pi
+        self.field_function = _thickeningFunction(
+            surface_function, thickening, gradient
+        )
+        if thickening == "isovalue":
+            self.thickness = thickness * np.pi
+        else:
+            self.thickness = 0.5 * thickness
+        self.thickening = thickening
 
         if type(cell_size) == float or type(cell_size) == int:
             self.cell_size = (cell_size, cell_size, cell_size)
@@ -96,114 +898,211 @@ class Tpms(BasicGeometry):
         else:
             self.repeat_cell = repeat_cell
 
+        if repeat_mode != "copy" and repeat_mode != "field":
+            raise ValueError("repeat_mode must be 'copy' or 'field'")
+        self.repeat_mode = repeat_mode
+
+        if thickness_field is not None or cell_size_field is not None:
+            if isinstance(thickness_field, np.ndarray):
+                thickness_field = SampledField(thickness_field, self._domainBounds())
+            if isinstance(cell_size_field, np.ndarray):
+                cell_size_field = SampledField(cell_size_field, self._domainBounds())
+            # factor between the thickness field and its bound on field_function
+            bound = np.pi if thickening == "isovalue" else 0.5
+            self.field_function = GradedFunction(
+                self.field_function,
+                thickness_field,
+                cell_size_field,
+                thickness=bound,
+                distance=thickening == "normal",
+            )
+            if thickness_field is not None:
+                self.thickness = 1.0
+        self.thickness_field = thickness_field
+        self.cell_size_field = cell_size_field
+
+        self.memory_budget = memory_budget
+        self.memmap_dir = memmap_dir
+        self.dtype = dtype
+        self.refinement = refinement
+        self.workers = workers
+
+        # face counts and runtime of the last decimated surfaces, one dict per isovalue
+        self.decimation_report = []  # type: list[dict]
+
+    def _domainSize(self) -> tuple[float, float, float]:
+        """
+        Returns the dimensions of the sampled domain, in unit cells
+        """
+        if self.repeat_mode == "field" and self.repeat_cell is not None:
+            return tuple(float(n) for n in self.repeat_cell)
+        return (1.0, 1.0, 1.0)
+
+    def _domainBounds(self) -> np.ndarray:
+        """
+        Returns the (3, 2) array of min and max coordinates of the sampled domain
+        """
+        half = 0.5 * np.array(self._domainSize())
+        return np.stack([-half, half], axis=1)
+
+    def _sampleField(self, nSample: int) -> pv.UniformGrid:
+        """
+        Samples surface_function over the domain centered on the origin
+
+        :param nSample: number of samples in each direction per unit cell
+        """
+        size = self._domainSize()
+        return sampleField(
+            self.field_function,
+            nSample,
+            origin=tuple(-0.5 * length for length in size),
+            size=size,
+            memory_budget=self.memory_budget,
+            memmap_dir=self.memmap_dir,
+            dtype=self.dtype,
+            workers=self.workers,
+        )
+
+    def _surfaceMeshes(
+        self,
+        isovalues: list[float],
+        nSample: int,
+        smoothing: int,
+        smoothing_method: str = "vtk",
+        max_triangles: int = None,
+        max_deviation: float = None,
+    ) -> list[pv.PolyData]:
+        """
+        Contours the sampled field for each isovalue, on the uniform grid or
+        on the adaptive octree if refinement > 0
+
+        :param isovalues: height isovalues of the given tpms function
+        :param nSample: number of samples in each direction per unit cell
+        :param smoothing: smoothing loop iterations
+        :param smoothing_method: 'vtk' (pyvista smooth), 'laplacian' or 'taubin' (see smoothSurface)
+        :param max_triangles: if given, target number of triangles of each surface, decimated before BRep conversion (see :func:`decimateSurface`)
+        :param max_deviation: if given, maximum deviation allowed when decimating each surface
+        """
+        if max_triangles is not None or max_deviation is not None:
+            self.decimation_report = []
+        if self.refinement > 0:
+            size = self._domainSize()
+            grid = sampleAdaptive(
+                self.field_function,
+                isovalues,
+                nSample,
+                levels=self.refinement,
+                origin=tuple(-0.5 * length for length in size),
+                size=size,
+                dtype=self.dtype,
+            )
+        else:
+            grid = self._sampleField(nSample)
+
+        meshes = []
+        for isovalue in isovalues:
+            if self.refinement > 0:
+                mesh = grid.contour([isovalue], scalars=FIELD_NAME)
+            else:
+                mesh = grid.contour(
+                    1, scalars=FIELD_NAME, method="flying_edges", rng=(isovalue, 1)
+                )
+            if smoothing > 0:
+                mesh = smoothSurface(
+                    mesh, smoothing, smoothing_method, bounds=self._domainBounds()
+                )
+            mesh.clean(inplace=True)
+            if max_triangles is not None or max_deviation is not None:
+                start = time.perf_counter()
+                n_faces = mesh.n_faces
+                mesh = decimateSurface(mesh, max_triangles, max_deviation)
+                self.decimation_report.append(
+                    {
+                        "isovalue": isovalue,
+                        "n_faces": n_faces,
+                        "n_faces_decimated": mesh.n_faces,
+                        "time": time.perf_counter() - start,
+                    }
+                )
+            meshes.append(mesh)
+        return meshes
+
     def createSurface(
         self,
         isovalue: float = 0,
         nSample: int = 20,
         smoothing: int = 100,
+        smoothing_method: str = "vtk",
+        max_triangles: int = None,
+        max_deviation: float = None,
     ) -> cq.Shell:
         """
         Create TPMS surface for the corresponding isovalue, return a cq.Shell
+        (over the whole repeated domain if repeat_mode is 'field')
 
         :param isovalue: height isovalue of the given tpms function
         :param nSample: surface file name
         :param smoothing: smoothing loop iterations
+        :param smoothing_method: 'vtk' (pyvista smooth), 'laplacian' or 'taubin' (see smoothSurface)
+        :param max_triangles: if given, target number of triangles of each surface, decimated before BRep conversion (see :func:`decimateSurface`)
+        :param max_deviation: if given, maximum deviation allowed when decimating each surface
         """
-        x_min, y_min, z_min = -0.5, -0.5, -0.5
-        grid = pv.UniformGrid(
-            dims=(nSample, nSample, nSample),
-            spacing=(1.0 / (nSample - 1), 1.0 / (nSample - 1), 1.0 / (nSample - 1)),
-            origin=(x_min, y_min, z_min),
-        )
-        x, y, z = grid.points.T
-
-        surface_function = self.surface_function
-        surface = surface_function(x, y, z)
-        mesh = grid.contour(
-            1, scalars=surface, method="flying_edges", rng=(isovalue, 1)
-        )
-        if smoothing > 0:
-            mesh = mesh.smooth(n_iter=smoothing)
-        mesh.clean(inplace=True)
-
+        mesh = self._surfaceMeshes(
+            [isovalue],
+            nSample,
+            smoothing,
+            smoothing_method,
+            max_triangles,
+            max_deviation,
+        )[0]
         list_of_Triangles = mesh.faces.reshape(-1, 4)[:, 1:]
-        list_of_Triangles = np.c_[list_of_Triangles, list_of_Triangles[:, 0]]
-
-        faces = []
-
-        for ixs in list_of_Triangles:
-            lines = []
-            for v1, v2 in zip(ixs[:], ixs[1:]):
-                vertice_coords1 = mesh.points[v1]
-                vertice_coords2 = mesh.points[v2]
-                lines.append(
-                    cq.Edge.makeLine(
-                        cq.Vector(*vertice_coords1), cq.Vector(*vertice_coords2)
-                    )
-                )
-            wire = cq.Wire.assembleEdges(lines)
-            faces.append(cq.Face.makeFromWires(wire))
 
-        return cq.Shell.makeShell(faces)
+        return trianglesToShell(mesh.points, list_of_Triangles)
 
     def createSurfaces(
         self,
         isovalues: list[float] = [0],
         nSample: int = 20,
         smoothing: int = 100,
+        smoothing_method: str = "vtk",
+        max_triangles: int = None,
+        max_deviation: float = None,
     ) -> list[cq.Shell]:
         """
         Create TPMS surfaces for the corresponding isovalue, return a list of cq.Shell
+        (over the whole repeated domain if repeat_mode is 'field')
 
         :param numsber_surfaces: number of surfaces
         :param isovalues: height isovalues of the given tpms function
         :param nSample: surface file name
         :param smoothing: smoothing loop iterations
+        :param smoothing_method: 'vtk' (pyvista smooth), 'laplacian' or 'taubin' (see smoothSurface)
+        :param max_triangles: if given, target number of triangles of each surface, decimated before BRep conversion (see :func:`decimateSurface`)
+        :param max_deviation: if given, maximum deviation allowed when decimating each surface
         """
-        x_min, y_min, z_min = -0.5, -0.5, -0.5
-        grid = pv.UniformGrid(
-            dims=(nSample, nSample, nSample),
-            spacing=(1.0 / (nSample - 1), 1.0 / (nSample - 1), 1.0 / (nSample - 1)),
-            origin=(x_min, y_min, z_min),
+        meshes = self._surfaceMeshes(
+            isovalues,
+            nSample,
+            smoothing,
+            smoothing_method,
+            max_triangles,
+            max_deviation,
+        )
+        # the BRep conversions of the isovalues are independent
+        return buildShapes(
+            trianglesToShell,
+            [(mesh.points, mesh.faces.reshape(-1, 4)[:, 1:]) for mesh in meshes],
+            self.workers,
         )
-        x, y, z = grid.points.T
-
-        surface_function = self.surface_function
-        surface = surface_function(x, y, z)
-
-        shells = []
-        for isovalue in isovalues:
-            mesh = grid.contour(
-                1, scalars=surface, method="flying_edges", rng=(isovalue, 1)
-            )
-            if smoothing > 0:
-                mesh = mesh.smooth(n_iter=smoothing)
-            mesh.clean(inplace=True)
-            list_of_Triangles = mesh.faces.reshape(-1, 4)[:, 1:]
-            list_of_Triangles = np.c_[list_of_Triangles, list_of_Triangles[:, 0]]
-
-            faces = []
-            for ixs in list_of_Triangles:
-                lines = []
-                for v1, v2 in zip(ixs, ixs[1:]):
-                    vertice_coords1 = mesh.points[v1]
-                    vertice_coords2 = mesh.points[v2]
-                    lines.append(
-                        cq.Edge.makeLine(
-                            cq.Vector(*vertice_coords1), cq.Vector(*vertice_coords2)
-                        )
-                    )
-                wire = cq.Wire.assembleEdges(lines)
-                faces.append(cq.Face.makeFromWires(wire))
-            shells.append(cq.Shell.makeShell(faces))
-
-        return shells
 
     def generateSurfaceVtk(
         self,
         isovalue: float = 0,
         nSample: int = 20,
         smoothing: int = 100,
+        smoothing_method: str = "vtk",
+        max_triangles: int = None,
+        max_deviation: float = None,
     ) -> pv.PolyData:
         """
         Create TPMS surface for the corresponding isovalue, returns a pv.Polydata
@@ -211,49 +1110,38 @@ class Tpms(BasicGeometry):
         :param isovalue: height isovalue of the given tpms function
         :param nSample: surface file name
         :param smoothing: smoothing loop iterations
+        :param smoothing_method: 'vtk' (pyvista smooth), 'laplacian' or 'taubin' (see smoothSurface)
+        :param max_triangles: if given, target number of triangles of each surface, decimated before BRep conversion (see :func:`decimateSurface`)
+        :param max_deviation: if given, maximum deviation allowed when decimating each surface
         """
-        x_min, y_min, z_min = -0.5, -0.5, -0.5
-        grid = pv.UniformGrid(
-            dims=(nSample, nSample, nSample),
-            spacing=(1.0 / (nSample - 1), 1.0 / (nSample - 1), 1.0 / (nSample - 1)),
-            origin=(x_min, y_min, z_min),
-        )
-        x, y, z = grid.points.T
+        mesh = self._surfaceMeshes(
+            [isovalue],
+            nSample,
+            smoothing,
+            smoothing_method,
+            max_triangles,
+            max_deviation,
+        )[0]
 
-        surface_function = self.surface_function
-        surface = surface_function(x, y, z)
-        mesh = grid.contour(
-            1, scalars=surface, method="flying_edges", rng=(isovalue, 1)
-        )
-        if smoothing > 0:
-            mesh = mesh.smooth(n_iter=smoothing)
-        mesh.clean(inplace=True)
-
-        if self.cell_size is not None:
-            transform_matrix = np.array(
-                [
-                    [self.cell_size[0], 0, 0, 0],
-                    [0, self.cell_size[1], 0, 0],
-                    [0, 0, self.cell_size[2], 0],
-                    [0, 0, 0, 1],
-                ]
-            )
-            mesh.transform(transform_matrix, inplace=True)
-
-        if self.repeat_cell is not None:
-            mesh = repeatPolyData(mesh, rve=Rve(*self.cell_size), grid=self.repeat_cell)
-
-        return mesh
+        return self._transformVtk(mesh)
 
     def generateSurface(
         self,
         isovalue: float = 0.0,
         nSample: int = 20,
         smoothing: int = 100,
+        smoothing_method: str = "vtk",
+        max_triangles: int = None,
+        max_deviation: float = None,
     ) -> cq.Shape:
 
         shell = self.createSurface(
-            isovalue=isovalue, nSample=nSample, smoothing=smoothing
+            isovalue=isovalue,
+            nSample=nSample,
+            smoothing=smoothing,
+            smoothing_method=smoothing_method,
+            max_triangles=max_triangles,
+            max_deviation=max_deviation,
         )
 
         return_object = cq.Shape(shell.wrapped)
@@ -267,94 +1155,287 @@ class Tpms(BasicGeometry):
             )
             return_object = return_object.transformGeometry(transform_mat)
 
-        if self.repeat_cell is not None:
+        if self.repeat_cell is not None and self.repeat_mode == "copy":
             return_object = repeatShape(
                 unit_geom=return_object, rve=Rve(*self.cell_size), grid=self.repeat_cell
             )
         return return_object
 
+    def _bandValue(self, solid: cq.Solid, spacing: float) -> float:
+        """
+        Returns |f| - thickness at the most decisive interior point found in
+        solid (negative inside the sheet band, positive in the skeletal part)
+
+        Candidates are the center of mass and points stepped inward from a few
+        face centers, kept only if they are classified inside the solid.
+
+        :param solid: piece of the box split by the outer surfaces
+        :param spacing: sampling step of the field, used as inward step length
+        """
+        candidates = [solid.Center()]
+        faces = solid.Faces()
+        for face in faces[:: max(1, len(faces) // 8)][:8]:
+            center = face.Center()
+            normal = face.normalAt(center)
+            for step in (0.25, 0.5, 1.0, 2.0):
+                candidates.append(center - normal * (step * spacing))
+                candidates.append(center + normal * (step * spacing))
+
+        inside = [
+            point
+            for point in candidates
+            if solid.isInside(point, tolerance=1.0e-6 * spacing)
+        ]
+        if not inside:
+            inside = candidates[:1]
+
+        points = np.array([point.toTuple() for point in inside])
+        values = np.abs(
+            self.field_function(points[:, 0], points[:, 1], points[:, 2])
+        )
+        values = values - self.thickness
+        return float(values[np.argmax(np.abs(values))])
+
     def generate(
         self,
         nSample: int = 20,
         smoothing: int = 100,
+        smoothing_method: str = "vtk",
+        max_triangles: int = None,
+        max_deviation: float = None,
+        band_mesh: bool = False,
     ) -> cq.Shape:
         """
         Creates thick TPMS geometry (sheet or skeletal part) from surface
 
+        By default, the unit box is split by the surfaces of isovalues
+        -thickness and thickness and the pieces of the part are fused. With
+        band_mesh=True, the closed boundary of the part is contoured from the
+        sampled field (as in generateVtk with implicit=True) and sewn directly
+        into solids, without any boolean operation
+
         :param nSample: surface file name
         :param smoothing: smoothing loop iterations
+        :param smoothing_method: 'vtk' (pyvista smooth), 'laplacian' or 'taubin' (see smoothSurface)
+        :param max_triangles: if given, target number of triangles of each surface, decimated before BRep conversion (see :func:`decimateSurface`), not used with band_mesh
+        :param max_deviation: if given, maximum deviation allowed when decimating each surface, not used with band_mesh
+        :param band_mesh: if True, builds the solids from the closed band mesh instead of splitting the box
         """
+        if band_mesh:
+            shape = self._bandSolids(nSample, smoothing, smoothing_method)
+        else:
+            shape = self._splitBox(
+                nSample, smoothing, smoothing_method, max_triangles, max_deviation
+            )
 
-        isovalues = [
-            -self.thickness,
-            -self.thickness / 3.0,
-            self.thickness / 3.0,
-            self.thickness,
-        ]
+        if self.cell_size != (1.0, 1.0, 1.0):
+            # about the cell origin, as in _transformVtk: the center of mass
+            # of a graded part is not at the origin
+            transform_mat = cq.Matrix(
+                [
+                    [self.cell_size[0], 0, 0, 0],
+                    [0, self.cell_size[1], 0, 0],
+                    [0, 0, self.cell_size[2], 0],
+                ]
+            )
+            shape = shape.transformGeometry(transform_mat)
+
+        if self.repeat_cell != (1, 1, 1) and self.repeat_mode == "copy":
+            shape = repeatShape(
+                unit_geom=shape,
+                rve=Rve(
+                    dim_x=self.cell_size[0],
+                    dim_y=self.cell_size[1],
+                    dim_z=self.cell_size[2],
+                    center=self.center,
+                ),
+                grid=self.repeat_cell,
+            )
+        return shape
+
+    def _bandSolids(
+        self, nSample: int, smoothing: int, smoothing_method: str = "vtk"
+    ) -> cq.Shape:
+        """
+        Sews each connected component of the closed band mesh into a solid
+
+        :param nSample: number of samples in each direction per unit cell
+        :param smoothing: smoothing loop iterations
+        :param smoothing_method: 'vtk' (pyvista smooth), 'laplacian' or 'taubin' (see smoothSurface)
+
+        :return: cq.Solid, or cq.Compound of solids if the part has several components
+        """
+        mesh = self._bandMesh(nSample, smoothing, smoothing_method).connectivity()
+        triangles = mesh.faces.reshape(-1, 4)[:, 1:]
+        regions = mesh.cell_data["RegionId"]
+
+        solids = []
+        for region in np.unique(regions):
+            used, region_triangles = np.unique(
+                triangles[regions == region], return_inverse=True
+            )
+            shell = trianglesToShell(
+                mesh.points[used], region_triangles.reshape(-1, 3)
+            )
+            # orients the shell outward whatever the triangle winding
+            solid = ShapeFix_Solid().SolidFromShell(shell.wrapped)
+            solids.append(cq.Solid(solid))
+
+        if len(solids) == 1:
+            return solids[0]
+        return cq.Compound.makeCompound(solids)
+
+    def _splitBox(
+        self,
+        nSample: int,
+        smoothing: int,
+        smoothing_method: str = "vtk",
+        max_triangles: int = None,
+        max_deviation: float = None,
+    ) -> cq.Shape:
+        """
+        Splits the unit box by the surfaces of isovalues -thickness and
+        thickness and fuses the pieces of the sheet or skeletal part
+
+        :param nSample: number of samples in each direction per unit cell
+        :param smoothing: smoothing loop iterations
+        :param smoothing_method: 'vtk' (pyvista smooth), 'laplacian' or 'taubin' (see smoothSurface)
+        :param max_triangles: if given, target number of triangles of each surface, decimated before BRep conversion (see :func:`decimateSurface`)
+        :param max_deviation: if given, maximum deviation allowed when decimating each surface
+        """
+        isovalues = [-self.thickness, self.thickness]
         shells = self.createSurfaces(
-            isovalues=isovalues, nSample=nSample, smoothing=smoothing
+            isovalues=isovalues,
+            nSample=nSample,
+            smoothing=smoothing,
+            smoothing_method=smoothing_method,
+            max_triangles=max_triangles,
+            max_deviation=max_deviation,
         )
 
-        face_cut_tp = shells[2]
-        face_cut_tm = shells[1]
-        face_cut_p = shells[3]
+        face_cut_p = shells[1]
         face_cut_m = shells[0]
 
-        box_wp = cq.Workplane("front").box(1, 1, 1)
+        box_wp = cq.Workplane("front").box(*self._domainSize())
 
         boxCut_wp = box_wp.split(face_cut_p)
         boxCut_wp = boxCut_wp.split(face_cut_m)
 
         boxWorkplanes = boxCut_wp.solids().all()  # type: list[cq.Workplane]
 
-        listShapes = []  # type: list[tuple[int, cq.Shape]]
-
+        # each piece lies entirely inside or outside the band |f| < thickness,
+        # so the field at one of its interior points is enough to classify it
+        spacing = 1.0 / (nSample - 1)
+        listShapes = []  # type: list[tuple[bool, cq.Shape]]
         for wp in boxWorkplanes:
-            listShapes.append(
-                (wp.split(face_cut_tp).split(face_cut_tm).solids().size(), wp.val())
-            )
+            solid = wp.val()
+            listShapes.append((self._bandValue(solid, spacing) < 0, solid))
 
         if self.type_part == "sheet":
-            sheet = [shape for (number, shape) in listShapes if number > 1]
+            sheet = [shape for (in_band, shape) in listShapes if in_band]
             to_fuse = [cq.Shape(shape.wrapped) for shape in sheet]
             shape = fuseShapes(to_fuse, True)
         elif self.type_part == "skeletal":
-            skeletal = [shape for (number, shape) in listShapes if number == 1]
+            skeletal = [shape for (in_band, shape) in listShapes if not in_band]
             to_fuse = [cq.Shape(shape.wrapped) for shape in skeletal]
             shape = fuseShapes(to_fuse, False)
-
-        if self.cell_size != (1.0, 1.0, 1.0):
-            shape = rescale(shape=shape, scale=self.cell_size)
-
-        if self.repeat_cell != (1, 1, 1):
-            shape = repeatShape(
-                unit_geom=shape,
-                rve=Rve(
-                    dim_x=self.cell_size[0],
-                    dim_y=self.cell_size[1],
-                    dim_z=self.cell_size[2],
-                    center=self.center,
-                ),
-                grid=self.repeat_cell,
-            )
         return shape
 
     def generateVtk(
         self,
         nSample: int = 20,
         smoothing: int = 100,
+        smoothing_method: str = "vtk",
+        max_triangles: int = None,
+        max_deviation: float = None,
+        implicit: bool = False,
     ) -> pv.PolyData:
         """
         Creates thick TPMS geometry (sheet or skeletal part) from surface
         Calls generate function and converts cq.Shape to pv.Polydata
 
+        With implicit=True, the part is built directly from the sampled field
+        without BRep: the sheet (abs(f) < thickness) or skeletal
+        (abs(f) > thickness) region of the unit cell is clipped from the grid
+        and its closed boundary is returned
+
         :param nSample: surface file name
         :param smoothing: smoothing loop iterations
+        :param smoothing_method: 'vtk' (pyvista smooth), 'laplacian' or 'taubin' (see smoothSurface)
+        :param max_triangles: if given, target number of triangles of each surface, decimated before BRep conversion (see :func:`decimateSurface`), not used if implicit
+        :param max_deviation: if given, maximum deviation allowed when decimating each surface, not used if implicit
+        :param implicit: if True, skips the BRep generation
         """
-        shape = self.generate(nSample=nSample, smoothing=smoothing)
-        return pv.PolyData(
-            shape.toVtkPolyData(tolerance=0.01, angularTolerance=0.1, normals=True)
-        )
+        if not implicit:
+            shape = self.generate(
+                nSample=nSample,
+                smoothing=smoothing,
+                smoothing_method=smoothing_method,
+                max_triangles=max_triangles,
+                max_deviation=max_deviation,
+            )
+            return pv.PolyData(
+                shape.toVtkPolyData(tolerance=0.01, angularTolerance=0.1, normals=True)
+            )
+
+        mesh = self._bandMesh(nSample, smoothing, smoothing_method)
+
+        return self._transformVtk(mesh)
+
+    def _bandMesh(
+        self, nSample: int, smoothing: int, smoothing_method: str = "vtk"
+    ) -> pv.PolyData:
+        """
+        Returns the closed triangulated boundary of the sheet (abs(f) < thickness)
+        or skeletal (abs(f) > thickness) region of the sampled domain, clipped
+        from the grid, before scaling and repetition
+
+        :param nSample: number of samples in each direction per unit cell
+        :param smoothing: smoothing loop iterations
+        :param smoothing_method: 'vtk' (pyvista smooth), 'laplacian' or 'taubin' (see smoothSurface)
+        """
+        grid = self._sampleField(nSample)
+        if self.type_part == "sheet":
+            part = grid.clip_scalar(
+                scalars=FIELD_NAME, value=-self.thickness, invert=False
+            ).clip_scalar(scalars=FIELD_NAME, value=self.thickness, invert=True)
+        else:
+            part = grid.clip_scalar(
+                scalars=FIELD_NAME, value=self.thickness, invert=False
+            ).merge(
+                grid.clip_scalar(scalars=FIELD_NAME, value=-self.thickness, invert=True)
+            )
+        mesh = part.extract_surface().triangulate().clean()
+
+        if smoothing > 0:
+            mesh = smoothSurface(
+                mesh, smoothing, smoothing_method, bounds=self._domainBounds()
+            )
+
+        return mesh
+
+    def _transformVtk(self, mesh: pv.PolyData) -> pv.PolyData:
+        """
+        Scales the unit cell mesh to cell_size and repeats it according to
+        repeat_cell
+
+        :param mesh: unit cell mesh
+        """
+        if self.cell_size is not None:
+            transform_matrix = np.array(
+                [
+                    [self.cell_size[0], 0, 0, 0],
+                    [0, self.cell_size[1], 0, 0],
+                    [0, 0, self.cell_size[2], 0],
+                    [0, 0, 0, 1],
+                ]
+            )
+            mesh.transform(transform_matrix, inplace=True)
+
+        if self.repeat_cell is not None and self.repeat_mode == "copy":
+            mesh = repeatPolyData(mesh, rve=Rve(*self.cell_size), grid=self.repeat_cell)
+
+        return mesh
 
 
 #  Lidinoid -> 0.5*(sin(2*x)*cos(y)*sin(z) + sin(2*y)*cos(z)*sin(x) + sin(2*z)*cos(x)*sin(y)) - 0.5*(cos(2*x)*cos(2*y) + cos(2*y)*cos(2*z) + cos(2*z)*cos(2*x)) + 0.15 = 0
@@ -379,11 +1460,9 @@ def gyroid(x: float, y: float, z: float) -> float:
 
        shape.plot(color='white')
     """
-    return (
-        sin(2 * pi * x) * cos(2 * pi * y)
-        + sin(2 * pi * y) * cos(2 * pi * z)
-        + sin(2 * pi * z) * cos(2 * pi * x)
-    )
+    sx, sy, sz = sin(2 * pi * x), sin(2 * pi * y), sin(2 * pi * z)
+    cx, cy, cz = cos(2 * pi * x), cos(2 * pi * y), cos(2 * pi * z)
+    return sx * cy + sy * cz + sz * cx
 
 
 def schwarzP(x: float, y: float, z: float) -> float:
@@ -427,11 +1506,10 @@ def schwarzD(x: float, y: float, z: float) -> float:
 
        shape.plot(color='white') 
     """
-    a = sin(2 * pi * x) * sin(2 * pi * y) * sin(2 * pi * z)
-    b = sin(2 * pi * x) * cos(2 * pi * y) * cos(2 * pi * z)
-    c = cos(2 * pi * x) * sin(2 * pi * y) * cos(2 * pi * z)
-    d = cos(2 * pi * x) * cos(2 * pi * y) * sin(2 * pi * z)
-    return a + b + c + d
+    sx, sy, sz = sin(2 * pi * x), sin(2 * pi * y), sin(2 * pi * z)
+    cx, cy, cz = cos(2 * pi * x), cos(2 * pi * y), cos(2 * pi * z)
+    # sx sy sz + sx cy cz + cx sy cz + cx cy sz
+    return sx * (sy * sz + cy * cz) + cx * (sy * cz + cy * sz)
 
 
 def neovius(x: float, y: float, z: float) -> float:
@@ -453,8 +1531,9 @@ def neovius(x: float, y: float, z: float) -> float:
 
        shape.plot(color='white') 
     """
-    a = 3 * cos(2 * pi * x) + cos(2 * pi * y) + cos(2 * pi * z)
-    b = 4 * cos(2 * pi * x) * cos(2 * pi * y) * cos(2 * pi * z)
+    cx, cy, cz = cos(2 * pi * x), cos(2 * pi * y), cos(2 * pi * z)
+    a = 3 * cx + cy + cz
+    b = 4 * cx * (cy * cz)
 
     return a + b
 
@@ -478,12 +1557,10 @@ def schoenIWP(x: float, y: float, z: float) -> float:
 
        shape.plot(color='white') 
     """
-    a = 2 * (
-        cos(2 * pi * x) * cos(2 * pi * y)
-        + cos(2 * pi * y) * cos(2 * pi * z)
-        + cos(2 * pi * z) * cos(2 * pi * x)
-    )
-    b = cos(4 * pi * x) + cos(4 * pi * y) + cos(4 * pi * z)
+    cx, cy, cz = cos(2 * pi * x), cos(2 * pi * y), cos(2 * pi * z)
+    c2x, c2y, c2z = cos(4 * pi * x), cos(4 * pi * y), cos(4 * pi * z)
+    a = 2 * (cx * cy + cy * cz + cz * cx)
+    b = c2x + c2y + c2z
 
     return a - b
 
@@ -507,12 +1584,10 @@ def schoenFRD(x: float, y: float, z: float) -> float:
 
        shape.plot(color='white') 
     """
-    a = 4 * cos(2 * pi * x) * cos(2 * pi * y) * cos(2 * pi * z)
-    b = (
-        cos(4 * pi * x) * cos(4 * pi * y)
-        + cos(4 * pi * y) * cos(4 * pi * z)
-        + cos(4 * pi * z) * cos(4 * pi * x)
-    )
+    cx, cy, cz = cos(2 * pi * x), cos(2 * pi * y), cos(2 * pi * z)
+    c2x, c2y, c2z = cos(4 * pi * x), cos(4 * pi * y), cos(4 * pi * z)
+    a = 4 * cx * (cy * cz)
+    b = c2x * c2y + c2y * c2z + c2z * c2x
     return a - b
 
 
@@ -535,9 +1610,12 @@ def fischerKochS(x: float, y: float, z: float) -> float:
 
        shape.plot(color='white') 
     """
-    a = cos(4 * pi * x) * sin(2 * pi * y) * cos(2 * pi * z)
-    b = cos(2 * pi * x) * cos(4 * pi * y) * sin(2 * pi * z)
-    c = sin(2 * pi * x) * cos(2 * pi * y) * cos(4 * pi * z)
+    sx, sy, sz = sin(2 * pi * x), sin(2 * pi * y), sin(2 * pi * z)
+    cx, cy, cz = cos(2 * pi * x), cos(2 * pi * y), cos(2 * pi * z)
+    c2x, c2y, c2z = cos(4 * pi * x), cos(4 * pi * y), cos(4 * pi * z)
+    a = c2x * (sy * cz)
+    b = cx * (c2y * sz)
+    c = sx * (cy * c2z)
 
     return a + b + c
 
@@ -561,10 +1639,13 @@ def pmy(x: float, y: float, z: float) -> float:
 
        shape.plot(color='white') 
     """
-    a = 2 * cos(2 * pi * x) * cos(2 * pi * y) * cos(2 * pi * z)
-    b = sin(4 * pi * x) * sin(2 * pi * y)
-    c = sin(2 * pi * x) * sin(4 * pi * z)
-    d = sin(4 * pi * y) * sin(2 * pi * z)
+    sx, sy, sz = sin(2 * pi * x), sin(2 * pi * y), sin(2 * pi * z)
+    s2x, s2y, s2z = sin(4 * pi * x), sin(4 * pi * y), sin(4 * pi * z)
+    cx, cy, cz = cos(2 * pi * x), cos(2 * pi * y), cos(2 * pi * z)
+    a = 2 * cx * (cy * cz)
+    b = s2x * sy
+    c = sx * s2z
+    d = s2y * sz
 
     return a + b + c + d
 
@@ -588,4 +1669,160 @@ def honeycomb(x: float, y: float, z: float) -> float:
 
        shape.plot(color='white') 
     """
-    return sin(2 * pi * x) * cos(2 * pi * y) + sin(2 * pi * y) + cos(2 * pi * z)
+    sx, sy = sin(2 * pi * x), sin(2 * pi * y)
+    cy, cz = cos(2 * pi * y), cos(2 * pi * z)
+    return sx * cy + sy + cz
+
+
+# functions written only with products and sums of one-axis factors, they are
+# evaluated on the grid axes and broadcast to 3D by sampleField
+separable_functions = {
+    gyroid,
+    schwarzP,
+    schwarzD,
+    neovius,
+    schoenIWP,
+    schoenFRD,
+    fischerKochS,
+    pmy,
+    honeycomb,
+}
+
+
+def gyroidGradient(x: float, y: float, z: float) -> tuple[float, float, float]:
+    """
+    Gradient of :func:`gyroid`
+    """
+    w = 2 * pi
+    sx, sy, sz = sin(w * x), sin(w * y), sin(w * z)
+    cx, cy, cz = cos(w * x), cos(w * y), cos(w * z)
+    return (
+        w * (cx * cy - sz * sx),
+        w * (cy * cz - sx * sy),
+        w * (cz * cx - sy * sz),
+    )
+
+
+def schwarzPGradient(x: float, y: float, z: float) -> tuple[float, float, float]:
+    """
+    Gradient of :func:`schwarzP`
+    """
+    w = 2 * pi
+    return (-w * sin(w * x), -w * sin(w * y), -w * sin(w * z))
+
+
+def schwarzDGradient(x: float, y: float, z: float) -> tuple[float, float, float]:
+    """
+    Gradient of :func:`schwarzD`
+    """
+    w = 2 * pi
+    sx, sy, sz = sin(w * x), sin(w * y), sin(w * z)
+    cx, cy, cz = cos(w * x), cos(w * y), cos(w * z)
+    return (
+        w * (cx * (sy * sz + cy * cz) - sx * (sy * cz + cy * sz)),
+        w * (sx * (cy * sz - sy * cz) + cx * (cy * cz - sy * sz)),
+        w * (sx * (sy * cz - cy * sz) + cx * (cy * cz - sy * sz)),
+    )
+
+
+def neoviusGradient(x: float, y: float, z: float) -> tuple[float, float, float]:
+    """
+    Gradient of :func:`neovius`
+    """
+    w = 2 * pi
+    sx, sy, sz = sin(w * x), sin(w * y), sin(w * z)
+    cx, cy, cz = cos(w * x), cos(w * y), cos(w * z)
+    return (
+        -w * sx * (3 + 4 * cy * cz),
+        -w * sy * (1 + 4 * cx * cz),
+        -w * sz * (1 + 4 * cx * cy),
+    )
+
+
+def schoenIWPGradient(x: float, y: float, z: float) -> tuple[float, float, float]:
+    """
+    Gradient of :func:`schoenIWP`
+    """
+    w = 2 * pi
+    sx, sy, sz = sin(w * x), sin(w * y), sin(w * z)
+    cx, cy, cz = cos(w * x), cos(w * y), cos(w * z)
+    s2x, s2y, s2z = sin(2 * w * x), sin(2 * w * y), sin(2 * w * z)
+    return (
+        2 * w * (s2x - sx * (cy + cz)),
+        2 * w * (s2y - sy * (cz + cx)),
+        2 * w * (s2z - sz * (cx + cy)),
+    )
+
+
+def schoenFRDGradient(x: float, y: float, z: float) -> tuple[float, float, float]:
+    """
+    Gradient of :func:`schoenFRD`
+    """
+    w = 2 * pi
+    sx, sy, sz = sin(w * x), sin(w * y), sin(w * z)
+    cx, cy, cz = cos(w * x), cos(w * y), cos(w * z)
+    s2x, s2y, s2z = sin(2 * w * x), sin(2 * w * y), sin(2 * w * z)
+    c2x, c2y, c2z = cos(2 * w * x), cos(2 * w * y), cos(2 * w * z)
+    return (
+        w * (2 * s2x * (c2y + c2z) - 4 * sx * (cy * cz)),
+        w * (2 * s2y * (c2z + c2x) - 4 * sy * (cz * cx)),
+        w * (2 * s2z * (c2x + c2y) - 4 * sz * (cx * cy)),
+    )
+
+
+def fischerKochSGradient(
+    x: float, y: float, z: float
+) -> tuple[float, float, float]:
+    """
+    Gradient of :func:`fischerKochS`
+    """
+    w = 2 * pi
+    sx, sy, sz = sin(w * x), sin(w * y), sin(w * z)
+    cx, cy, cz = cos(w * x), cos(w * y), cos(w * z)
+    s2x, s2y, s2z = sin(2 * w * x), sin(2 * w * y), sin(2 * w * z)
+    c2x, c2y, c2z = cos(2 * w * x), cos(2 * w * y), cos(2 * w * z)
+    return (
+        w * (cx * (cy * c2z) - 2 * s2x * (sy * cz) - sx * (c2y * sz)),
+        w * (c2x * (cy * cz) - 2 * cx * (s2y * sz) - sx * (sy * c2z)),
+        w * (cx * (c2y * cz) - c2x * (sy * sz) - 2 * sx * (cy * s2z)),
+    )
+
+
+def pmyGradient(x: float, y: float, z: float) -> tuple[float, float, float]:
+    """
+    Gradient of :func:`pmy`
+    """
+    w = 2 * pi
+    sx, sy, sz = sin(w * x), sin(w * y), sin(w * z)
+    cx, cy, cz = cos(w * x), cos(w * y), cos(w * z)
+    s2x, s2y, s2z = sin(2 * w * x), sin(2 * w * y), sin(2 * w * z)
+    c2x, c2y, c2z = cos(2 * w * x), cos(2 * w * y), cos(2 * w * z)
+    return (
+        w * (2 * c2x * sy + cx * s2z - 2 * sx * (cy * cz)),
+        w * (s2x * cy + 2 * c2y * sz - 2 * cx * (sy * cz)),
+        w * (2 * sx * c2z + s2y * cz - 2 * cx * (cy * sz)),
+    )
+
+
+def honeycombGradient(x: float, y: float, z: float) -> tuple[float, float, float]:
+    """
+    Gradient of :func:`honeycomb`
+    """
+    w = 2 * pi
+    sx, sy = sin(w * x), sin(w * y)
+    cx, cy = cos(w * x), cos(w * y)
+    return (w * cx * cy, w * (cy - sx * sy), -w * sin(w * z))
+
+
+# analytic gradients of the available functions, used by thickening='normal'
+surface_gradients = {
+    gyroid: gyroidGradient,
+    schwarzP: schwarzPGradient,
+    schwarzD: schwarzDGradient,
+    neovius: neoviusGradient,
+    schoenIWP: schoenIWPGradient,
+    schoenFRD: schoenFRDGradient,
+    fischerKochS: fischerKochSGradient,
+    pmy: pmyGradient,
+    honeycomb: honeycombGradient,
+}
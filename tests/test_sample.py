@@ -1,5 +1,9 @@
 import microgen
 
+import cadquery as cq
+import numpy as np
+import pyvista as pv
+
 from sys import platform
 
 def test_misc():
@@ -26,6 +30,16 @@ def test_operations():
     microgen.repeatShape(shape1, rve, grid=[2, 2, 2])
 
 
+def test_trianglesToShell():
+    sphere = pv.Sphere(theta_resolution=12, phi_resolution=12).triangulate().clean()
+    triangles = sphere.faces.reshape(-1, 4)[:, 1:]
+    shell = microgen.trianglesToShell(sphere.points, triangles)
+    assert len(shell.Faces()) == sphere.n_faces
+    assert shell.Closed()
+    solid = cq.Solid.makeSolid(shell)
+    assert np.isclose(solid.Volume(), sphere.volume)
+
+
 if __name__ == "__main__":
     test_misc()
     test_operations()
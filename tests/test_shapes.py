@@ -7,6 +7,19 @@ import os
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def field_cache():
+    """
+    Empties the shared TPMS field cache around each test and restores its bound
+    """
+    cache = microgen.shape.tpms.field_cache
+    max_bytes = cache.max_bytes
+    cache.clear()
+    yield cache
+    cache.resize(max_bytes)
+    cache.clear()
+
+
 def test_shapes():
     os.makedirs("tests/data", exist_ok=True)  # if data folder doesn't exist yet
 
@@ -119,6 +132,10 @@ def test_tpms():
     elem.generate()
     elem.generateVtk()
 
+    mesh = elem.generateVtk(implicit=True)
+    assert mesh.n_open_edges == 0
+    assert np.allclose(mesh.bounds, [-0.5, 0.5, -0.5, 0.5, -0.5, 0.5])
+
     elem = microgen.shape.tpms.Tpms(
         center=(0.5, 0.5, 0.5),
         surface_function=microgen.shape.tpms.schwarzD,
@@ -130,6 +147,7 @@ def test_tpms():
     elem.generate()
     elem.generateSurface(isovalue=0.1)
     elem.generateSurfaceVtk()
+    elem.generateVtk(implicit=True)
 
     with pytest.raises(ValueError):
         microgen.shape.tpms.Tpms(
@@ -139,6 +157,23 @@ def test_tpms():
             thickness=0.3,
         )
 
+    elem = microgen.shape.tpms.Tpms(
+        surface_function=microgen.shape.tpms.gyroid,
+        thickness=0.05,
+        cell_size=(1, 2, 1),
+        repeat_cell=(2, 1, 1),
+        repeat_mode="field",
+    )
+    mesh = elem.generateVtk(implicit=True)
+    assert mesh.n_open_edges == 0
+    assert np.allclose(mesh.bounds, [-1.0, 1.0, -1.0, 1.0, -0.5, 0.5])
+    elem.generateSurfaceVtk()
+
+    with pytest.raises(ValueError):
+        microgen.shape.tpms.Tpms(
+            surface_function=microgen.shape.tpms.gyroid, repeat_mode="fake"
+        )
+
     assert microgen.shape.tpms.schwarzP(0, 0, 0) == 3
     assert microgen.shape.tpms.schwarzD(0, 0, 0) == 0 + 0 + 0 + 0
     assert (
@@ -156,6 +191,452 @@ def test_tpms():
     assert microgen.shape.tpms.gyroid(0, 0, 0) == 0
 
 
+def test_tpms_classification():
+    volumes = {}
+    for type_part in ["sheet", "skeletal"]:
+        elem = microgen.shape.tpms.Tpms(
+            surface_function=microgen.shape.tpms.gyroid,
+            type_part=type_part,
+            thickness=0.1,
+        )
+        exact = elem.generate(nSample=20, smoothing=0).Volume()
+        implicit = elem.generateVtk(nSample=20, smoothing=0, implicit=True).volume
+        assert np.isclose(exact, implicit, rtol=1.0e-2)
+
+        volumes[type_part] = elem.generate(nSample=20).Volume()
+        implicit = elem.generateVtk(nSample=20, implicit=True).volume
+        assert np.isclose(volumes[type_part], implicit, rtol=5.0e-2)
+    # the pieces bounded by the smoothed surfaces are all kept exactly once
+    assert np.isclose(volumes["sheet"] + volumes["skeletal"], 1.0, rtol=1.0e-4)
+
+
+def test_tpms_field_cache(field_cache):
+    cache = field_cache
+    grid = microgen.shape.tpms.sampleField(microgen.shape.tpms.gyroid, nSample=10)
+    assert grid.dimensions == (10, 10, 10)
+    assert len(cache) == 1
+
+    elem = microgen.shape.tpms.Tpms(
+        surface_function=microgen.shape.tpms.gyroid, thickness=0.1
+    )
+    elem.generateSurfaceVtk(nSample=10)
+    assert len(cache) == 1
+    assert microgen.shape.tpms.sampleField(microgen.shape.tpms.gyroid, 10) is grid
+
+    assert cache.nbytes >= grid.actual_memory_size * 1024
+    assert cache.nbytes > grid.point_data[microgen.shape.tpms.FIELD_NAME].nbytes
+
+    microgen.shape.tpms.sampleField(microgen.shape.tpms.schwarzP, nSample=10)
+    assert len(cache) == 2
+    cache.resize(cache.nbytes - 1)
+    assert len(cache) == 1
+    assert microgen.shape.tpms.sampleField(microgen.shape.tpms.gyroid, 10) is not grid
+
+    cache.clear()
+    cache.resize(2**20)
+    adaptive = microgen.shape.tpms.sampleAdaptive(
+        microgen.shape.tpms.gyroid, isovalues=[0.0], nSample=5, levels=2
+    )
+    assert cache.nbytes > adaptive.points.nbytes + adaptive.cells.nbytes
+
+
+def test_tpms_separable():
+    for surface_function in microgen.shape.tpms.separable_functions:
+        grid = microgen.shape.tpms.sampleField(surface_function, nSample=11)
+        x, y, z = grid.points.T
+        assert np.allclose(
+            grid.point_data[microgen.shape.tpms.FIELD_NAME],
+            surface_function(x, y, z),
+        )
+
+
+def test_tpms_chunked_field(tmp_path):
+    def custom(x, y, z):
+        return microgen.shape.tpms.gyroid(x, y, z)
+
+    for surface_function in [microgen.shape.tpms.gyroid, custom]:
+        field = microgen.shape.tpms.evaluateField(
+            surface_function, origin=(-0.5, -0.5, -0.5), spacing=0.1, dims=(11, 11, 11)
+        )
+        chunked = microgen.shape.tpms.evaluateField(
+            surface_function,
+            origin=(-0.5, -0.5, -0.5),
+            spacing=0.1,
+            dims=(11, 11, 11),
+            memory_budget=1,
+            memmap_dir=str(tmp_path),
+        )
+        assert isinstance(chunked, np.memmap)
+        assert np.array_equal(field, chunked)
+
+        parallel = microgen.shape.tpms.evaluateField(
+            surface_function,
+            origin=(-0.5, -0.5, -0.5),
+            spacing=0.1,
+            dims=(11, 11, 11),
+            workers=2,
+        )
+        assert np.array_equal(field, parallel)
+
+
+def test_tpms_float32(monkeypatch):
+    elem = microgen.shape.tpms.Tpms(
+        surface_function=microgen.shape.tpms.gyroid, thickness=0.05, dtype=np.float32
+    )
+    assert elem._sampleField(nSample=10)[microgen.shape.tpms.FIELD_NAME].dtype == np.float32
+    assert elem.generateVtk(nSample=10, implicit=True).n_open_edges == 0
+
+    monkeypatch.setattr(microgen.shape.tpms, "default_dtype", np.float32)
+    grid = microgen.shape.tpms.sampleField(microgen.shape.tpms.schwarzP, nSample=10)
+    assert grid[microgen.shape.tpms.FIELD_NAME].dtype == np.float32
+
+
+def test_tpms_adaptive():
+    octree = microgen.shape.tpms.sampleAdaptive(
+        microgen.shape.tpms.gyroid, isovalues=[0.3], nSample=10, levels=2
+    )
+    uniform = microgen.shape.tpms.sampleField(microgen.shape.tpms.gyroid, nSample=37)
+    assert octree.n_points < uniform.n_points
+
+    name = microgen.shape.tpms.FIELD_NAME
+    mesh = octree.contour([0.3], scalars=name)
+    reference = uniform.contour([0.3], scalars=name, method="flying_edges")
+    assert mesh.n_faces == reference.n_faces
+    assert mesh.n_open_edges == reference.n_open_edges
+    assert np.isclose(mesh.area, reference.area)
+
+    elem = microgen.shape.tpms.Tpms(
+        surface_function=microgen.shape.tpms.gyroid, refinement=1
+    )
+    elem.createSurface(nSample=10, smoothing=0)
+
+
+def test_tpms_smoothing():
+    grid = microgen.shape.tpms.sampleField(microgen.shape.tpms.gyroid, nSample=20)
+    name = microgen.shape.tpms.FIELD_NAME
+    mesh = grid.contour(1, scalars=name, method="flying_edges", rng=(0.3, 1))
+    bounds = np.array(grid.bounds).reshape(3, 2)
+    on_bounds = np.any(
+        np.isclose(mesh.points, bounds[:, 0]) | np.isclose(mesh.points, bounds[:, 1]),
+        axis=1,
+    )
+    for method in ["vtk", "laplacian", "taubin"]:
+        smoothed = microgen.shape.tpms.smoothSurface(
+            mesh, n_iter=20, method=method, bounds=bounds
+        )
+        assert smoothed.n_points == mesh.n_points
+        assert np.allclose(smoothed.points[on_bounds], mesh.points[on_bounds])
+        assert not np.allclose(smoothed.points, mesh.points)
+
+    with pytest.raises(ValueError):
+        microgen.shape.tpms.smoothSurface(mesh, method="sinc")
+
+    elem = microgen.shape.tpms.Tpms(
+        surface_function=microgen.shape.tpms.gyroid, thickness=0.1
+    )
+    elem.generateVtk(nSample=10, smoothing=20, smoothing_method="taubin", implicit=True)
+    elem.generateSurfaceVtk(nSample=10, smoothing=20, smoothing_method="laplacian")
+
+
+def test_tpms_normal_thickening():
+    points = np.random.default_rng(0).random((3, 100))
+    step = 1.0e-6
+    for function, gradient in microgen.shape.tpms.surface_gradients.items():
+        finite_differences = [
+            (
+                function(*(points + step * axis[:, None]))
+                - function(*(points - step * axis[:, None]))
+            )
+            / (2 * step)
+            for axis in np.eye(3)
+        ]
+        assert np.allclose(gradient(*points), finite_differences, atol=1.0e-6)
+
+    elem = microgen.shape.tpms.Tpms(
+        surface_function=microgen.shape.tpms.schwarzP,
+        thickness=0.1,
+        thickening="normal",
+    )
+    outer = elem.generateSurfaceVtk(isovalue=elem.thickness, nSample=30, smoothing=0)
+    inner = elem.generateSurfaceVtk(isovalue=-elem.thickness, nSample=30, smoothing=0)
+    outer.compute_implicit_distance(inner, inplace=True)
+    inside = np.all(np.abs(outer.points) < 0.45, axis=1)
+    wall = np.abs(outer["implicit_distance"][inside])
+    assert np.isclose(wall.mean(), 0.1, rtol=0.1)
+    assert wall.std() < 0.02 * wall.mean()
+    elem.generateVtk(nSample=10, smoothing=0, implicit=True)
+
+    with pytest.raises(ValueError):
+        microgen.shape.tpms.Tpms(
+            surface_function=lambda x, y, z: x, thickness=0.1, thickening="normal"
+        )
+    with pytest.raises(ValueError):
+        microgen.shape.tpms.Tpms(
+            surface_function=microgen.shape.tpms.gyroid, thickening="offset"
+        )
+
+
+def test_tpms_volume_fraction():
+    for type_part in ["sheet", "skeletal"]:
+        for thickening in ["isovalue", "normal"]:
+            thickness, isovalues = microgen.shape.tpms.volumeFractionToThickness(
+                microgen.shape.tpms.gyroid,
+                0.3,
+                type_part=type_part,
+                thickening=thickening,
+            )
+            assert isovalues[0] == -isovalues[1]
+            elem = microgen.shape.tpms.Tpms(
+                surface_function=microgen.shape.tpms.gyroid,
+                type_part=type_part,
+                thickness=thickness,
+                thickening=thickening,
+            )
+            assert np.isclose(elem.thickness, isovalues[1])
+            vtk = elem.generateVtk(nSample=40, smoothing=0, implicit=True)
+            assert np.isclose(vtk.volume, 0.3, atol=0.01)
+
+    with pytest.raises(ValueError):
+        microgen.shape.tpms.volumeFractionToThickness(microgen.shape.tpms.gyroid, 1.2)
+    with pytest.raises(ValueError):
+        microgen.shape.tpms.volumeFractionToThickness(
+            microgen.shape.tpms.gyroid, 0.3, type_part="solid"
+        )
+
+
+def test_tpms_decimation():
+    grid = microgen.shape.tpms.sampleField(microgen.shape.tpms.gyroid, nSample=30)
+    name = microgen.shape.tpms.FIELD_NAME
+    mesh = grid.contour(1, scalars=name, method="flying_edges", rng=(0.3, 1))
+    boundary = mesh.extract_feature_edges(
+        boundary_edges=True,
+        feature_edges=False,
+        manifold_edges=False,
+        non_manifold_edges=False,
+    )
+
+    decimated = microgen.shape.tpms.decimateSurface(mesh, max_triangles=1000)
+    assert decimated.n_faces <= 1000
+    assert decimated.n_open_edges == mesh.n_open_edges
+    kept = decimated.extract_feature_edges(
+        boundary_edges=True,
+        feature_edges=False,
+        manifold_edges=False,
+        non_manifold_edges=False,
+    )
+    assert np.allclose(np.sort(kept.points, axis=0), np.sort(boundary.points, axis=0))
+
+    decimated = microgen.shape.tpms.decimateSurface(mesh, max_deviation=0.01)
+    assert decimated.n_faces < mesh.n_faces
+    distance = mesh.compute_implicit_distance(decimated)["implicit_distance"]
+    assert np.max(np.abs(distance)) <= 0.01
+
+    with pytest.raises(ValueError):
+        microgen.shape.tpms.decimateSurface(mesh)
+
+    elem = microgen.shape.tpms.Tpms(
+        surface_function=microgen.shape.tpms.gyroid, thickness=0.1
+    )
+    shell = elem.createSurface(
+        isovalue=0.3, nSample=30, smoothing=0, max_triangles=1000
+    )
+    assert len(shell.Faces()) <= 1000
+    assert elem.decimation_report[0]["n_faces"] == mesh.n_faces
+    assert elem.decimation_report[0]["n_faces_decimated"] == len(shell.Faces())
+
+
+def test_tpms_band_mesh():
+    for type_part in ["sheet", "skeletal"]:
+        elem = microgen.shape.tpms.Tpms(
+            surface_function=microgen.shape.tpms.gyroid,
+            type_part=type_part,
+            thickness=0.1,
+        )
+        shape = elem.generate(nSample=20, smoothing=0, band_mesh=True)
+        mesh = elem.generateVtk(nSample=20, smoothing=0, implicit=True)
+        assert shape.isValid()
+        assert all(solid.Volume() > 0 for solid in shape.Solids())
+        assert np.isclose(shape.Volume(), mesh.volume, rtol=1.0e-6)
+        box = shape.BoundingBox()
+        assert np.allclose([box.xlen, box.ylen, box.zlen], 1.0)
+
+
+def test_tpms_graded():
+    tpms = microgen.shape.tpms
+    uniform = tpms.Tpms(surface_function=tpms.gyroid, thickness=0.1)
+    constant = tpms.Tpms(
+        surface_function=tpms.gyroid,
+        thickness_field=lambda x, y, z: np.full_like(x, 0.1),
+    )
+    assert np.isclose(
+        constant.generateVtk(nSample=20, smoothing=0, implicit=True).volume,
+        uniform.generateVtk(nSample=20, smoothing=0, implicit=True).volume,
+    )
+
+    grid = np.linspace(-0.5, 0.5, 5)
+    values = 0.05 + 0.1 * (grid[:, None, None] + 0.5) * np.ones((5, 5, 5))
+    field = tpms.SampledField(values, np.array([[-0.5, 0.5]] * 3))
+    assert np.allclose(field(grid, grid, grid), values[:, 0, 0])
+    assert np.isclose(field(0.125, 0.0, 0.0), 0.1125)
+
+    graded = tpms.Tpms(surface_function=tpms.gyroid, thickness_field=values)
+    mesh = graded.generateVtk(nSample=20, smoothing=0, implicit=True)
+    left = mesh.clip_closed_surface(normal="-x")
+    right = mesh.clip_closed_surface(normal="x")
+    assert np.isclose(left.volume + right.volume, mesh.volume)
+    assert right.volume > left.volume
+
+    graded = tpms.Tpms(
+        surface_function=tpms.gyroid, thickness_field=values, cell_size=(2, 1, 1)
+    )
+    shape = graded.generate(nSample=20, smoothing=0)
+    mesh = graded.generateVtk(nSample=20, smoothing=0, implicit=True)
+    box = shape.BoundingBox()
+    assert np.allclose([box.xmin, box.ymin, box.zmin], [-1.0, -0.5, -0.5], atol=1.0e-3)
+    assert np.allclose([box.xmax, box.ymax, box.zmax], [1.0, 0.5, 0.5], atol=1.0e-3)
+    assert np.allclose(mesh.bounds, [-1.0, 1.0, -0.5, 0.5, -0.5, 0.5])
+    assert np.isclose(shape.Volume(), mesh.volume, rtol=1.0e-2)
+
+    graded = tpms.Tpms(
+        surface_function=tpms.gyroid,
+        thickness=0.1,
+        cell_size_field=lambda x, y, z: 0.5 + 0 * x,
+    )
+    field = graded.field_function
+    assert np.isclose(field(0.1, 0.2, 0.3), tpms.gyroid(0.2, 0.4, 0.6))
+
+
+def test_tpms_parallel_surfaces():
+    tpms = microgen.shape.tpms
+    isovalues = [-0.3, 0.0, 0.3]
+    sequential = tpms.Tpms(surface_function=tpms.gyroid, thickness=0.1)
+    parallel = tpms.Tpms(surface_function=tpms.gyroid, thickness=0.1, workers=3)
+    shells = sequential.createSurfaces(isovalues, nSample=20, smoothing=0)
+    parallel_shells = parallel.createSurfaces(isovalues, nSample=20, smoothing=0)
+    for shell, parallel_shell in zip(shells, parallel_shells):
+        assert len(parallel_shell.Faces()) == len(shell.Faces())
+        assert np.isclose(parallel_shell.Area(), shell.Area())
+
+    sweep = [
+        tpms.Tpms(surface_function=tpms.schwarzP, thickness=thickness)
+        for thickness in [0.05, 0.1]
+    ]
+    # the booleans of generate start the OCC thread pool before the batch
+    volume = sweep[0].generate(nSample=10, smoothing=0).Volume()
+    shapes = tpms.generateBatch(sweep, workers=2, nSample=10, smoothing=0)
+    assert len(shapes) == 2
+    assert np.isclose(shapes[0].Volume(), volume)
+    assert shapes[0].Volume() < shapes[1].Volume()
+
+
+def test_fuse_shapes():
+    boxes = [
+        microgen.shape.box.Box(center=(0.5 * i, 0, 0)).generate() for i in range(4)
+    ]
+    fused = microgen.fuseShapes(boxes, retain_edges=False)
+    assert np.isclose(fused.Volume(), 2.5)
+    assert len(fused.Solids()) == 1
+    assert len(fused.Faces()) == 6
+    retained = microgen.fuseShapes(boxes, retain_edges=True)
+    assert np.isclose(retained.Volume(), 2.5)
+    assert len(retained.Faces()) > 6
+    single = microgen.fuseShapes(boxes[:1], retain_edges=True)
+    assert np.isclose(single.Volume(), 1.0)
+
+
+def test_parallel_booleans():
+    spheres = [
+        microgen.shape.sphere.Sphere(center=(0.3 * i, 0.1 * (i % 2), 0), radius=0.2)
+        .generate()
+        for i in range(8)
+    ]
+    fused = microgen.fuseShapes(spheres, retain_edges=False)
+    tree_fused = microgen.fuseShapes(spheres, retain_edges=False, workers=2)
+    assert np.isclose(tree_fused.Volume(), fused.Volume(), rtol=1.0e-6)
+
+    cutted = microgen.cutShapes(spheres)
+    parallel_cutted = microgen.cutShapes(spheres, workers=2)
+    assert len(parallel_cutted) == len(cutted)
+    for shape, parallel_shape in zip(cutted, parallel_cutted):
+        assert np.isclose(parallel_shape.Volume(), shape.Volume(), rtol=1.0e-6)
+    assert np.isclose(sum(shape.Volume() for shape in cutted), fused.Volume())
+
+
+def test_overlap_components():
+    centers = [(0, 0, 0), (0.3, 0, 0), (2, 0, 0), (0.6, 0.3, 0), (2, 0.3, 0)]
+    spheres = [
+        microgen.shape.sphere.Sphere(center=center, radius=0.2).generate()
+        for center in centers
+    ]
+    # the bounding boxes of the second and fourth spheres overlap, not the spheres
+    components = microgen.overlapComponents(spheres)
+    assert sorted(components) == [[0, 1], [2, 4], [3]]
+
+    rng = np.random.default_rng(0)
+    lower = rng.random((50, 3)) * 5
+    boxes = np.stack([lower, lower + rng.random((50, 3))], axis=1)
+    overlap = np.all(
+        (boxes[:, None, 0] <= boxes[None, :, 1])
+        & (boxes[:, None, 1] >= boxes[None, :, 0]),
+        axis=2,
+    )
+    expected = np.argwhere(np.triu(overlap, k=1))
+    assert np.array_equal(microgen.overlappingPairs(boxes), expected)
+    expected = np.argwhere(overlap[:20, 20:])
+    assert np.array_equal(microgen.overlappingPairs(boxes[:20], boxes[20:]), expected)
+
+    fused = microgen.fuseShapes(spheres, retain_edges=False)
+    assert len(fused.Solids()) == 3
+    cap = np.pi * 0.05**2 * (3 * 0.2 - 0.05) / 3
+    sphere = 4 / 3 * np.pi * 0.2**3
+    assert np.isclose(fused.Volume(), 5 * sphere - 4 * cap, rtol=1.0e-3)
+
+
+def test_cut_shapes():
+    boxes = [
+        microgen.shape.box.Box(center=center).generate()
+        for center in [(0, 0, 0), (0.5, 0, 0), (3, 0, 0), (0.5, 0.5, 0)]
+    ]
+    volumes = [shape.Volume() for shape in microgen.cutShapes(boxes)]
+    assert np.allclose(volumes, [0.5, 0.5, 1.0, 1.0])
+    volumes = [
+        shape.Volume() for shape in microgen.cutShapes(boxes, reverseOrder=False)
+    ]
+    assert np.allclose(volumes, [0.5, 1.0, 0.5, 1.0])
+    phases = microgen.cutPhases([microgen.Phase(shape=box) for box in boxes])
+    volumes = [phase.shape.Volume() for phase in phases]
+    assert np.allclose(volumes, [0.5, 0.5, 1.0, 1.0])
+
+
+def test_cut_phase_by_shape_list():
+    phase = microgen.Phase(shape=microgen.shape.box.Box().generate())
+    holes = [
+        microgen.shape.box.Box(center=center, dim_x=0.5, dim_y=0.5, dim_z=2).generate()
+        for center in [(0.25, 0.25, 0), (-0.25, -0.25, 0), (3, 3, 3)]
+    ]
+    cut = microgen.cutPhaseByShapeList(phaseToCut=phase, cqShapeList=holes)
+    assert np.isclose(cut.shape.Volume(), 0.5)
+    cut = microgen.cutPhaseByShapeList(phaseToCut=phase, cqShapeList=holes[2:])
+    assert np.isclose(cut.shape.Volume(), 1.0)
+
+
+def test_raster_solids():
+    rve = microgen.Rve(dim_x=1, dim_y=1, dim_z=1)
+    box = microgen.shape.box.Box().generate()
+    sphere = microgen.shape.sphere.Sphere(center=(0.25, 0.25, 0.25), radius=0.1)
+    solids = [box.Solids()[0], sphere.generate().Solids()[0]]
+    pieces, cells = microgen.rasterSolids(solids, rve, [3, 3, 3])
+    assert len(pieces) == 9
+    volume = sum(piece.Volume() for piece in pieces)
+    assert np.isclose(volume, 1 + 4 / 3 * np.pi * 0.1**3)
+    assert cells.min() == 0 and cells.max() == 1
+    assert np.all(cells[-1] == 1)
+    groups = microgen.groupByCell(pieces, cells, [3, 3, 3])
+    assert [len(group) for group in groups] == [1] * 7 + [2]
+
+    phases = microgen.rasterPhase(microgen.Phase(solids=solids), rve, [3, 3, 3])
+    assert len(phases) == 8
+
 if __name__ == "__main__":
     test_shapes()
     test_tpms()